@@ -1,18 +1,44 @@
+import atexit
+import itertools
+import operator
 import random
-import string
 import os
 import sys
-from typing import List, Tuple, Dict, Optional
+import threading
+from functools import lru_cache
+from typing import List, NamedTuple, Tuple, Dict, Optional, Union
+from dataclasses import dataclass, field
 from datetime import datetime # Added import for date/time
 
+try:
+    import numpy as np # Optional: only needed for the batch scoring helpers
+except ImportError:
+    np = None
+
+from mastermind_credentials import caesar_encrypt, needs_upgrade, submit_hash, submit_verify
+from logout import logout
+from mastermind_sessions import SessionStore, get_session_store, read_current_token, write_current_token
+from mastermind_storage import (USERNAME_RULE, PlayerStats, StorageBackend, WriteBehindWriter, get_storage,
+                                valid_username)
+from mastermind_usernames import get_username_suggester
+
 # GLOBAL VARIABLE CONSTANTS
-SHIFT_VAL = 7
 PLAYERS_FILE = "players.txt"
 HIGHSCORES_FILE = "highscores.txt"
 GAME_HISTORY_FILE = "game_history.txt" # New constant
+HISTORY_PAGE_SIZE = 10
+SESSIONS_FILE = "sessions.txt" # Login sessions shared with logout.py; None keeps them in memory
+# "text" for the files above, "binary[:<path>]" to keep game history in the compact
+# binary format (see mastermind_storage.py), or "sqlite:<path>" for a SQLite database
+STORAGE_BACKEND = os.environ.get("MASTERMIND_STORAGE", "text")
 COLORS = ["R", "G", "B", "Y", "W", "O"]
 CODE_LENGTH = 4
 MAX_ATTEMPTS = 10
+FEEDBACK_TABLE_FILE = "feedback_table_{colors}x{length}.npy"
+MAX_TABLE_CODES = 4096 # Feedback table is N*N bytes, so only small boards get one
+MAX_BITSET_CODES = 4096 # Boards above this track the possible codes by streaming, not in a CandidateSet
+MAX_SEARCH_CODES = 32768 # Boards up to this size get hints from the process-pool minimax search
+MAX_SEARCH_PAIRS = 20_000_000 # (guess, candidate) pairs per search: a few seconds on one core
 
 
 # --- Get Password in file with * (Asterisks) Function (Feature) ---
@@ -68,29 +94,90 @@ def get_password_with_asterisks(prompt="Password: "):
 
 # --- Generate Random Username Function ---
 
-def generate_random_username() -> str:
-    """Generates a random username consisting of 3 lowercase letters and 3 digits."""
-    letters = ''.join(random.choices(string.ascii_lowercase, k=3))
-    numbers = ''.join(random.choices(string.digits, k=3))
-    return letters + numbers
-
-
-# --- Caesar Encryption in password in file Function ---
-
-def caesar_encrypt(password: str, shift: int = SHIFT_VAL) -> str:
-    """Implements a Caesar cipher for letters (A-Z, a-z) and digits (0-9)."""
-    enc = []
-    for ch in password:
-        if ch.isalpha():
-            base = ord("A") if ch.isupper() else ord("a")
-            rotated = chr((ord(ch) - base + shift) % 26 + base)
-            enc.append(rotated)
-        elif ch.isdigit():
-            rotated = chr((ord(ch) - ord("0") + shift) % 10 + ord("0"))
-            enc.append(rotated)
-        else:
-            enc.append(ch)
-    return "".join(enc)
+def generate_random_username() -> Optional[str]:
+    """Suggests an unused username, 3 lowercase letters and 3 digits while those last."""
+    try:
+        return get_username_suggester(storage()).suggest()
+    except IOError as e:
+        print(f"Error reading the players file: {e}")
+        return None
+
+
+# --- Password Hashing ---
+# Passwords are hashed by mastermind_credentials (scrypt unless configured otherwise)
+# on its worker pool; caesar_encrypt is kept there for entries from old players files.
+
+def hash_new_password(password: str) -> str:
+    """Hashes a new password on the KDF pool and waits for the result."""
+    return submit_hash(password).result()
+
+
+def upgrade_password_later(username: str, password: str, old_stored: str) -> None:
+    """Re-hashes a legacy entry with the current scheme in the background after login."""
+    backend = storage()
+
+    def save(future):
+        try:
+            # Skip it if the password was changed meanwhile
+            if backend.get_password(username) == old_stored:
+                backend.set_password(username, future.result())
+        except (IOError, ValueError) as e:
+            print(f"Error upgrading the password for {username}: {e}")
+
+    submit_hash(password).add_done_callback(save)
+
+
+# --- Storage Backend Access ---
+
+def storage() -> StorageBackend:
+    """Returns the configured backend for players, highscores and game history."""
+    return get_storage(STORAGE_BACKEND, PLAYERS_FILE, HIGHSCORES_FILE, GAME_HISTORY_FILE)
+
+
+_result_writer: Optional[WriteBehindWriter] = None
+_result_writer_lock = threading.Lock()
+
+
+def result_writer() -> WriteBehindWriter:
+    """Returns the background writer for game results, starting it on first use."""
+    global _result_writer
+    with _result_writer_lock: # Two writers would lose whatever the dropped one queued
+        if _result_writer is None:
+            _result_writer = WriteBehindWriter()
+            atexit.register(close_result_writer)
+        return _result_writer
+
+
+def close_result_writer() -> None:
+    """Waits until every queued result is on disk, then stops the writer."""
+    global _result_writer
+    with _result_writer_lock:
+        writer, _result_writer = _result_writer, None
+    if writer is not None:
+        writer.close()
+
+
+# --- Login Sessions ---
+
+def sessions() -> SessionStore:
+    return get_session_store(SESSIONS_FILE)
+
+
+def start_session(username: str) -> None:
+    """Issues a session token after a login and saves it for this machine."""
+    try:
+        write_current_token(sessions().issue(username))
+    except IOError as e:
+        print(f"Error saving the session: {e}")
+
+
+def resume_session() -> Optional[str]:
+    """Returns the user of this machine's live session, or None."""
+    try:
+        token = read_current_token()
+        return sessions().resume(token) if token else None
+    except IOError:
+        return None
 
 
 # --- Check Username in file Function ---
@@ -98,18 +185,7 @@ def caesar_encrypt(password: str, shift: int = SHIFT_VAL) -> str:
 def check_username_exists(username: str) -> bool:
     """Checks if a username exists in the players file."""
     try:
-        with open(PLAYERS_FILE, "r", encoding="utf-8") as f:
-            for line in f:
-                line = line.strip()
-                if not line:
-                    continue
-                try:
-                    user, _ = line.split(",", 1)
-                except ValueError:
-                    continue
-                if user == username:
-                    return True
-        return False
+        return storage().user_exists(username)
     except FileNotFoundError:
         return False
     except IOError:
@@ -120,30 +196,14 @@ def check_username_exists(username: str) -> bool:
 
 def update_password_in_file(username: str, new_enc_pw: str) -> bool:
     """Updates the encrypted password for a specific user in the players file."""
-    lines = []
-    updated = False
     try:
-        with open(PLAYERS_FILE, "r", encoding="utf-8") as f:
-            for line in f:
-                line = line.strip()
-                if not line:
-                    lines.append("")
-                    continue
-                parts = line.split(",", 1)
-                if len(parts) == 2 and parts[0] == username:
-                    lines.append(f"{username},{new_enc_pw}")
-                    updated = True
-                else:
-                    lines.append(line)
-
-        if updated:
-            with open(PLAYERS_FILE, "w", encoding="utf-8") as f:
-                f.write('\n'.join(lines) + '\n')
-            return True
-        return False
+        return storage().set_password(username, new_enc_pw)
     except IOError as e:
         print(f"Error reading/writing database: {e}")
         return False
+    except ValueError as e: # A name from before usernames were restricted
+        print(f"Cannot update this account: {e}")
+        return False
 
 
 # --- Forgot Password Function (Feature) ---
@@ -168,8 +228,12 @@ def forgot_password() -> None:
             print("Password cannot be empty.")
             continue
 
-        enc_pw = caesar_encrypt(new_pw)
+        enc_pw = hash_new_password(new_pw)
         if update_password_in_file(username, enc_pw):
+            try:
+                sessions().revoke_user(username) # Log out everywhere with the old password
+            except IOError as e:
+                print(f"Error ending the old sessions: {e}")
             print("✅ Password successfully updated!")
             return
         else:
@@ -183,13 +247,17 @@ def register_user() -> None:
     """Handles user registration."""
     print("\n=== User Registration ===")
     random_user = generate_random_username()
-    print(f"Suggestion: Use '{random_user}'")
+    if random_user:
+        print(f"Suggestion: Use '{random_user}'")
 
     while True:
         username = input("Enter your username: ").strip().lower()
         if username == "":
             print("Username cannot be empty.")
             continue
+        if not valid_username(username):
+            print(f"Usernames are {USERNAME_RULE}.")
+            continue
         if check_username_exists(username):
             print("Username already taken.")
             continue
@@ -204,11 +272,12 @@ def register_user() -> None:
             print("Password cannot be empty.")
             continue
 
-        enc_pw = caesar_encrypt(pw)
+        enc_pw = hash_new_password(pw)
         try:
-            os.makedirs(os.path.dirname(PLAYERS_FILE) or ".", exist_ok=True)
-            with open(PLAYERS_FILE, "a", encoding="utf-8") as f:
-                f.write(f"{username},{enc_pw}\n")
+            if not storage().add_user(username, enc_pw):
+                print("Username already taken.") # Registered meanwhile by another player
+                continue
+            get_username_suggester(storage()).add(username)
             print("Registration successful.")
             return
         except IOError as e:
@@ -247,35 +316,7 @@ def login_user() -> Tuple[bool, str]:
 
 
         try:
-            with open(PLAYERS_FILE, "r", encoding="utf-8") as f:
-                for line in f:
-                    line = line.strip()
-                    if not line:
-                        continue
-                    try:
-                        user, stored_enc_pw = line.split(",", 1)
-                    except ValueError:
-                        continue
-
-
-                    if user == current_username:
-                        user_found = True
-                        if caesar_encrypt(pw) == stored_enc_pw:
-                            print("Login successful.")
-                            return True, current_username
-                        else:
-                            remaining_attempts = MAX_LOGIN_ATTEMPTS - attempts
-                            if remaining_attempts > 0:
-                                print(
-                                    f"Access Denied - {remaining_attempts} attempts remaining")
-                            else:
-                                print("Maximum login attempts reached.")
-                                print("Redirecting to password reset...")
-                                forgot_password()
-                                return False, ""
-                        break
-
-
+            stored_enc_pw = storage().get_password(current_username)
         except FileNotFoundError:
             print("Database file not found. Please register first.")
             return False, ""
@@ -284,6 +325,25 @@ def login_user() -> Tuple[bool, str]:
             return False, ""
 
 
+        if stored_enc_pw is not None:
+            user_found = True
+            if submit_verify(pw, stored_enc_pw).result():
+                print("Login successful.")
+                if needs_upgrade(stored_enc_pw):
+                    upgrade_password_later(current_username, pw, stored_enc_pw)
+                return True, current_username
+            else:
+                remaining_attempts = MAX_LOGIN_ATTEMPTS - attempts
+                if remaining_attempts > 0:
+                    print(
+                        f"Access Denied - {remaining_attempts} attempts remaining")
+                else:
+                    print("Maximum login attempts reached.")
+                    print("Redirecting to password reset...")
+                    forgot_password()
+                    return False, ""
+
+
         if not user_found:
             try_again = input(
                 "Username not found. Do you want to try again? (Y/N): ").strip().upper()
@@ -304,13 +364,84 @@ def login_user() -> Tuple[bool, str]:
     return False, ""
 
 
+# --- Game Configuration ---
+
+@dataclass(frozen=True)
+class GameConfig:
+    """Board settings for one game: color letters, pegs per code and attempts allowed."""
+    colors: Tuple[str, ...] = tuple(COLORS)
+    code_length: int = CODE_LENGTH
+    max_attempts: int = MAX_ATTEMPTS
+    # Derived lookups, filled in by __post_init__ (not part of equality/hash).
+    n_codes: int = field(init=False, repr=False, compare=False)
+    color_index: Dict[str, int] = field(init=False, repr=False, compare=False)
+    digits: List[Tuple[int, ...]] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, "n_codes", len(self.colors) ** self.code_length)
+        object.__setattr__(self, "color_index", {c: i for i, c in enumerate(self.colors)})
+        # Small boards keep every code's digits in memory; big ones compute them on demand.
+        object.__setattr__(self, "digits", list(itertools.product(
+            range(len(self.colors)), repeat=self.code_length))
+            if self.n_codes <= MAX_TABLE_CODES else [])
+
+    @property
+    def n_colors(self) -> int:
+        return len(self.colors)
+
+    @property
+    def label(self) -> str:
+        return f"{self.code_length} pegs x {self.n_colors} colors"
+
+
+DEFAULT_CONFIG = GameConfig()
+EXTRA_COLORS = ["P", "C", "M", "K"] # Purple, Cyan, Magenta, blacK
+VARIANTS = {
+    "1": ("Classic", DEFAULT_CONFIG),
+    "2": ("Hard", GameConfig(tuple(COLORS + EXTRA_COLORS[:2]), 5, 12)),
+    "3": ("Expert", GameConfig(tuple(COLORS + EXTRA_COLORS[:2]), 6, 14)),
+    "4": ("Master", GameConfig(tuple(COLORS + EXTRA_COLORS[:3]), 6, 16)),
+}
+
+
+# --- Code Encoding Functions ---
+
+# Inside the engine a code is a packed integer: the base-n_colors number whose
+# digits are the color indices, most significant first ("RRRR" == 0, "OOOO" == 1295).
+# Letters are only used at the UI boundary (parse_guess / decode_code).
+
+def encode_code(letters, config: GameConfig = DEFAULT_CONFIG) -> int:
+    """Packs a letter code (e.g. "RGBY" or ['R', 'G', 'B', 'Y']) into its integer form."""
+    code = 0
+    for ch in letters:
+        code = code * config.n_colors + config.color_index[ch]
+    return code
+
+
+def code_digits(code: int, config: GameConfig = DEFAULT_CONFIG) -> Tuple[int, ...]:
+    """Returns the color indices of a packed code, first peg first."""
+    if code < len(config.digits):
+        return config.digits[code]
+    digits = []
+    for _ in range(config.code_length):
+        code, d = divmod(code, config.n_colors)
+        digits.append(d)
+    return tuple(reversed(digits))
+
+
+def decode_code(code: int, config: GameConfig = DEFAULT_CONFIG) -> str:
+    """Unpacks an integer code into its letter form, e.g. 0 -> "RRRR"."""
+    return "".join(config.colors[d] for d in code_digits(code, config))
+
+
 # --- Core Game System Functions ---
 
-def generate_secret_code() -> List[str]:
-    return random.choices(COLORS, k=CODE_LENGTH)
+def generate_secret_code(config: GameConfig = DEFAULT_CONFIG,
+                         rng: Optional[random.Random] = None) -> int:
+    return (rng or random).randrange(config.n_codes)
 
 
-def parse_guess(raw: str) -> Optional[List[str]]:
+def parse_guess(raw: str, config: GameConfig = DEFAULT_CONFIG) -> Optional[int]:
     raw = raw.strip().upper()
     if not raw:
         return None
@@ -318,36 +449,363 @@ def parse_guess(raw: str) -> Optional[List[str]]:
     for sep in [",", " "]:
         if sep in raw:
             parts = [p for p in (raw.replace(",", " ").split()) if p]
-            if len(parts) != CODE_LENGTH:
+            if len(parts) != config.code_length:
                 return None
             parts = [p[0] for p in parts]
-            if all(p in COLORS for p in parts):
-                return parts
+            if all(p in config.color_index for p in parts):
+                return encode_code(parts, config)
             return None
 
-    if len(raw) == CODE_LENGTH and all(ch in COLORS for ch in raw):
-        return list(raw)
+    if len(raw) == config.code_length and all(ch in config.color_index for ch in raw):
+        return encode_code(raw, config)
 
     return None
 
 
-def score_guess(secret: List[str], guess: List[str]) -> Tuple[int, int]:
-    black = sum(1 for s, g in zip(secret, guess) if s == g)
+def score_guess(secret: int, guess: int, config: GameConfig = DEFAULT_CONFIG) -> Tuple[int, int]:
+    if _feedback_table is not None and config == _feedback_table_config:
+        return _feedback_decode[_feedback_table[0, secret, guess]]
 
-    secret_counts = {}
-    guess_counts = {}
+    black = 0
+    secret_counts = [0] * config.n_colors
+    guess_counts = [0] * config.n_colors
+
+    for s, g in zip(code_digits(secret, config), code_digits(guess, config)):
+        if s == g:
+            black += 1
+        else:
+            secret_counts[s] += 1
+            guess_counts[g] += 1
+
+    white = sum(map(min, secret_counts, guess_counts))
+    return black, white
+
+
+# --- Batch Scoring Functions (NumPy) ---
+
+def _require_numpy() -> None:
+    if np is None:
+        raise RuntimeError("NumPy is required for batch scoring (pip install numpy).")
+
+
+def _code_powers(config: GameConfig) -> "np.ndarray":
+    return config.n_colors ** np.arange(config.code_length - 1, -1, -1, dtype=np.int64)
+
+
+def codes_to_array(codes, config: GameConfig = DEFAULT_CONFIG) -> "np.ndarray":
+    """Unpacks integer codes into an (N, code_length) array of color indices."""
+    _require_numpy()
+    codes = np.asarray(codes, dtype=np.int64).reshape(-1)
+    return ((codes[:, None] // _code_powers(config)) % config.n_colors).astype(np.uint8)
+
+
+def array_to_codes(digits, config: GameConfig = DEFAULT_CONFIG) -> "np.ndarray":
+    """Packs an (N, code_length) array of color indices back into integer codes."""
+    _require_numpy()
+    digits = np.asarray(digits, dtype=np.int64).reshape(-1, config.code_length)
+    return digits @ _code_powers(config)
+
+
+def all_codes_array(config: GameConfig = DEFAULT_CONFIG) -> "np.ndarray":
+    """Returns every possible code as an (n_codes, code_length) array of color indices.
+
+    This materializes the whole code space; use iter_code_chunks() for large boards.
+    """
+    return codes_to_array(np.arange(config.n_codes), config)
+
+
+def color_counts(codes: "np.ndarray", config: GameConfig = DEFAULT_CONFIG) -> "np.ndarray":
+    """Counts how many times each color appears in every code: shape (N, n_colors)."""
+    return (codes[..., None] == np.arange(config.n_colors, dtype=codes.dtype)).sum(
+        axis=-2, dtype=np.uint8)
 
-    for i in range(len(secret)):
-        if secret[i] != guess[i]:
-            secret_counts[secret[i]] = secret_counts.get(secret[i], 0) + 1
-            guess_counts[guess[i]] = guess_counts.get(guess[i], 0) + 1
 
-    white = sum(min(guess_counts.get(color, 0), count)
-        for color, count in secret_counts.items())
+def score_guess_batch(secrets, guess, config: GameConfig = DEFAULT_CONFIG) -> Tuple["np.ndarray", "np.ndarray"]:
+    """Scores one guess against N secrets; returns (black, white) arrays of shape (N,)."""
+    _require_numpy()
+    secrets = np.asarray(secrets, dtype=np.uint8).reshape(-1, config.code_length)
+    guess = np.asarray(guess, dtype=np.uint8).reshape(config.code_length)
+
+    black = (secrets == guess).sum(axis=1, dtype=np.uint8)
+    # Colors in common (ignoring position) minus the exact hits gives the whites,
+    # which is the same duplicate-color rule score_guess applies.
+    common = np.minimum(color_counts(secrets, config), color_counts(guess, config)).sum(
+        axis=1, dtype=np.uint8)
+    return black, common - black
+
+
+def score_matrix(secrets, guesses, config: GameConfig = DEFAULT_CONFIG,
+                 max_block: int = 1 << 22) -> Tuple["np.ndarray", "np.ndarray"]:
+    """Scores every secret against every guess; returns (black, white) arrays of shape (N, M).
+
+    Rows are processed in blocks so the temporary arrays stay below max_block elements.
+    """
+    _require_numpy()
+    secrets = np.asarray(secrets, dtype=np.uint8).reshape(-1, config.code_length)
+    guesses = np.asarray(guesses, dtype=np.uint8).reshape(-1, config.code_length)
+    n, m = len(secrets), len(guesses)
+
+    black = np.empty((n, m), dtype=np.uint8)
+    white = np.empty((n, m), dtype=np.uint8)
+    secret_counts = color_counts(secrets, config)
+    guess_counts = color_counts(guesses, config)
+
+    rows = max(1, max_block // max(1, m * max(config.code_length, config.n_colors)))
+    for start in range(0, n, rows):
+        stop = min(n, start + rows)
+        b = (secrets[start:stop, None, :] == guesses[None, :, :]).sum(
+            axis=2, dtype=np.uint8)
+        common = np.minimum(secret_counts[start:stop, None, :],
+                            guess_counts[None, :, :]).sum(axis=2, dtype=np.uint8)
+        black[start:stop] = b
+        white[start:stop] = common - b
     return black, white
 
 
-def guess_position(secret: List[str], guess: List[str]):
+# --- Streaming Candidate Enumeration ---
+
+def iter_code_chunks(config: GameConfig = DEFAULT_CONFIG, chunk_size: int = 1 << 16):
+    """Yields the code space as consecutive arrays of at most chunk_size packed codes."""
+    _require_numpy()
+    for start in range(0, config.n_codes, chunk_size):
+        yield np.arange(start, min(config.n_codes, start + chunk_size), dtype=np.int64)
+
+
+def iter_candidates(history: List[Tuple[int, int, int]], config: GameConfig = DEFAULT_CONFIG,
+                    chunk_size: int = 1 << 16):
+    """Yields arrays of the codes consistent with every (guess, black, white) in history.
+
+    The code space is filtered one chunk at a time, so memory stays at O(chunk_size)
+    however large the board is.
+    """
+    for codes in iter_code_chunks(config, chunk_size):
+        digits = codes_to_array(codes, config)
+        keep = np.ones(len(codes), dtype=bool)
+        for guess, black, white in history:
+            b, w = score_guess_batch(digits, code_digits(guess, config), config)
+            keep &= (b == black) & (w == white)
+        if keep.any():
+            yield codes[keep]
+
+
+def count_candidates(history: List[Tuple[int, int, int]], config: GameConfig = DEFAULT_CONFIG) -> int:
+    """Counts the codes consistent with history without materializing them."""
+    return sum(len(chunk) for chunk in iter_candidates(history, config))
+
+
+def is_consistent(code: int, history: List[Tuple[int, int, int]], config: GameConfig = DEFAULT_CONFIG) -> bool:
+    """Whether code could be the secret, given every (guess, black, white) in history."""
+    return all(score_guess(code, guess, config) == (black, white) for guess, black, white in history)
+
+
+# --- Candidate Set Tracker ---
+
+@lru_cache(maxsize=256)
+def feedback_masks(guess: int, config: GameConfig = DEFAULT_CONFIG) -> Dict[int, int]:
+    """Groups the code space by the feedback each secret gives to this guess.
+
+    Returns {encoded feedback: bitmask}, where bit i of a mask is set when secret i
+    answers the guess with that feedback.
+    """
+    masks = {}
+    if np is None:
+        for secret in range(config.n_codes):
+            key = encode_feedback(*score_guess(secret, guess, config), config)
+            masks[key] = masks.get(key, 0) | (1 << secret)
+        return masks
+
+    if _feedback_table is not None and config == _feedback_table_config:
+        feedback = np.asarray(_feedback_table[0, :, guess])
+    else:
+        feedback = np.empty(config.n_codes, dtype=np.uint8)
+        guess_digits = code_digits(guess, config)
+        for codes in iter_code_chunks(config):
+            black, white = score_guess_batch(codes_to_array(codes, config), guess_digits, config)
+            feedback[codes[0]:codes[-1] + 1] = black * (config.code_length + 1) + white
+    for key in np.unique(feedback).tolist():
+        bits = np.packbits(feedback == key, bitorder="little")
+        masks[key] = int.from_bytes(bits.tobytes(), "little")
+    return masks
+
+
+class CandidateSet:
+    """The codes still consistent with the feedback so far, kept as the bits of one int."""
+
+    def __init__(self, config: GameConfig = DEFAULT_CONFIG):
+        self.config = config
+        self.bits = (1 << config.n_codes) - 1
+
+    def narrow(self, guess: int, black: int, white: int) -> None:
+        """Keeps only the codes that would have answered guess with (black, white)."""
+        key = encode_feedback(black, white, self.config)
+        self.bits &= feedback_masks(guess, self.config).get(key, 0)
+
+    def __len__(self) -> int:
+        return self.bits.bit_count()
+
+    def __contains__(self, code: int) -> bool:
+        return bool(self.bits >> code & 1)
+
+    def __iter__(self):
+        bits = self.bits
+        while bits:
+            low = bits & -bits
+            yield low.bit_length() - 1
+            bits ^= low
+
+
+class StreamingCandidates:
+    """CandidateSet's counterpart for boards too large for per-guess bitmasks.
+
+    Each narrow() streams the code space through iter_candidates, so memory stays
+    bounded; once at most MAX_BITSET_CODES codes remain they are kept in an array
+    and later guesses only rescore those.
+    """
+
+    def __init__(self, config: GameConfig = DEFAULT_CONFIG):
+        self.config = config
+        self.history: List[Tuple[int, int, int]] = []
+        self._codes = None # The remaining codes, once there are few enough
+        self._count = config.n_codes
+
+    def narrow(self, guess: int, black: int, white: int) -> None:
+        self.history.append((guess, black, white))
+        if self._codes is not None:
+            b, w = score_guess_batch(codes_to_array(self._codes, self.config),
+                                     code_digits(guess, self.config), self.config)
+            self._codes = self._codes[(b == black) & (w == white)]
+            self._count = len(self._codes)
+            return
+        chunks, count = [], 0
+        for chunk in iter_candidates(self.history, self.config):
+            count += len(chunk)
+            if count <= MAX_BITSET_CODES:
+                chunks.append(chunk)
+        self._count = count
+        if count <= MAX_BITSET_CODES:
+            self._codes = np.concatenate(chunks) if chunks else np.empty(0, dtype=np.int64)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __contains__(self, code: int) -> bool:
+        return is_consistent(code, self.history, self.config)
+
+
+# --- Feedback Lookup Table Functions ---
+
+# Loaded by load_feedback_table(): a (2, N, N) uint8 array indexed by
+# [kind, secret, guess] with packed integer codes, where kind 0 holds the encoded
+# score_guess result and kind 1 the encoded guess_position pattern. Only the
+# board in _feedback_table_config gets the fast path.
+_feedback_table = None
+_feedback_table_config = None
+_feedback_decode = []
+_position_decode = []
+
+
+def encode_feedback(black: int, white: int, config: GameConfig = DEFAULT_CONFIG) -> int:
+    """Packs a (black, white) result into a single byte."""
+    return black * (config.code_length + 1) + white
+
+
+def decode_feedback(byte: int, config: GameConfig = DEFAULT_CONFIG) -> Tuple[int, int]:
+    """Unpacks a byte made by encode_feedback() back into (black, white)."""
+    return divmod(byte, config.code_length + 1)
+
+
+def position_matrix(secrets, guesses, config: GameConfig = DEFAULT_CONFIG,
+                    max_block: int = 1 << 22) -> "np.ndarray":
+    """Encodes guess_position() for every secret/guess pair as a base-3 byte (X=0, W=1, B=2)."""
+    _require_numpy()
+    length = config.code_length
+    if 3 ** length > 256:
+        raise ValueError("guess_position patterns do not fit in a byte for this code length.")
+    secrets = np.asarray(secrets, dtype=np.uint8).reshape(-1, length)
+    guesses = np.asarray(guesses, dtype=np.uint8).reshape(-1, length)
+    n, m = len(secrets), len(guesses)
+    weights = (3 ** np.arange(length - 1, -1, -1)).astype(np.uint8)
+
+    patterns = np.empty((n, m), dtype=np.uint8)
+    rows = max(1, max_block // max(1, m * length * length))
+    for start in range(0, n, rows):
+        block = secrets[start:start + rows, None, :]
+        exact = block == guesses[None, :, :]
+        present = (block[:, :, :, None] == guesses[None, :, None, :]).any(axis=2)
+        digits = np.where(exact, 2, present.astype(np.uint8)).astype(np.uint8)
+        patterns[start:start + rows] = (digits * weights).sum(axis=2, dtype=np.uint8)
+    return patterns
+
+
+def build_feedback_table(config: GameConfig = DEFAULT_CONFIG) -> "np.ndarray":
+    """Computes the (2, N, N) feedback table for a board."""
+    _require_numpy()
+    n_codes = config.n_codes
+    if n_codes > MAX_TABLE_CODES:
+        raise ValueError(f"Board has {n_codes} codes; feedback table is limited to {MAX_TABLE_CODES}.")
+    codes = all_codes_array(config)
+    table = np.empty((2, n_codes, n_codes), dtype=np.uint8)
+    black, white = score_matrix(codes, codes, config)
+    table[0] = black * (config.code_length + 1) + white
+    table[1] = position_matrix(codes, codes, config)
+    return table
+
+
+def load_feedback_table(config: GameConfig = DEFAULT_CONFIG, path: Optional[str] = None) -> "np.ndarray":
+    """Memory-maps the feedback table from disk, building and saving it on first use.
+
+    Once loaded, score_guess() and guess_position() answer by table lookup for this
+    board. The file is opened read-only with mmap, so processes on the same host
+    share its pages.
+    """
+    global _feedback_table, _feedback_table_config, _feedback_decode, _position_decode
+    _require_numpy()
+    if _feedback_table is not None and config == _feedback_table_config and path is None:
+        return _feedback_table
+    if path is None:
+        path = FEEDBACK_TABLE_FILE.format(colors=config.n_colors, length=config.code_length)
+
+    n_codes = config.n_codes
+    try:
+        table = np.load(path, mmap_mode="r")
+        if table.shape != (2, n_codes, n_codes) or table.dtype != np.uint8:
+            raise ValueError(f"Stale feedback table in {path}")
+    except (FileNotFoundError, ValueError):
+        table = build_feedback_table(config)
+        # Write to a private temp file and rename it, so a process that loses the
+        # race (or crashes mid-write) never leaves a half-written table behind.
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                np.save(f, table)
+            os.replace(tmp_path, path)
+            table = np.load(path, mmap_mode="r")
+        except IOError as e:
+            print(f"Error writing feedback table: {e}")
+
+    length = config.code_length
+    _feedback_decode = [divmod(byte, length + 1) for byte in range(256)]
+    _position_decode = [
+        tuple("XWB"[(byte // 3 ** (length - 1 - i)) % 3] for i in range(length))
+        for byte in range(256)]
+    _feedback_table = table
+    _feedback_table_config = config
+    return table
+
+
+def unload_feedback_table() -> None:
+    """Turns the table fast path off again."""
+    global _feedback_table, _feedback_table_config
+    _feedback_table = None
+    _feedback_table_config = None
+
+
+def guess_position(secret: int, guess: int, config: GameConfig = DEFAULT_CONFIG) -> List[str]:
+    if _feedback_table is not None and config == _feedback_table_config:
+        return list(_position_decode[_feedback_table[1, secret, guess]])
+
+    secret = code_digits(secret, config)
+    guess = code_digits(guess, config)
     guess_colors = []
     for i in range(len(secret)):
         if secret[i] == guess[i]:
@@ -359,131 +817,325 @@ def guess_position(secret: List[str], guess: List[str]):
     return guess_colors
 
 
-def play_game(username: str) -> Tuple[int, bool]:
-    secret = generate_secret_code()
-    print("\n=== Mastermind: Guess the 4-color code ===")
+def _search_hint(history: List[Tuple[int, int, int]], config: GameConfig) -> int:
+    """The minimax guess over the remaining codes, or the first of them while too many remain."""
+    from mastermind_parallel import minimax_search
+    limit = max(1, MAX_SEARCH_PAIRS // config.n_codes)
+    chunks, remaining = [], 0
+    for chunk in iter_candidates(history, config):
+        chunks.append(chunk)
+        remaining += len(chunk)
+        if remaining > limit:
+            return int(chunks[0][0])
+    if not chunks:
+        raise ValueError("No code matches the feedback")
+    if remaining <= 2:
+        return int(chunks[0][0]) # Guessing either one is as good as any search
+    return minimax_search(np.concatenate(chunks), config)[0]
+
+
+def show_hint(history: List[Tuple[int, int, int]], config: GameConfig = DEFAULT_CONFIG) -> None:
+    """Prints a suggested next guess for the turns played so far.
+
+    Boards small enough for the feedback table get the Knuth minimax solver's guess.
+    Boards up to MAX_SEARCH_CODES get mastermind_parallel's minimax search once few
+    enough codes remain for it to be quick; otherwise, and on larger boards, the
+    hint is the first code still consistent with the feedback, found by streaming
+    the code space.
+    """
+    try:
+        if config.n_codes <= MAX_TABLE_CODES:
+            from mastermind_solver import suggest_guess
+            guess = suggest_guess(history, config)
+        elif config.n_codes <= MAX_SEARCH_CODES:
+            guess = _search_hint(history, config)
+        else:
+            guess = int(next(iter_candidates(history, config))[0])
+        print(f"Hint: try {decode_code(guess, config)}")
+    except (ImportError, RuntimeError) as e:
+        print(f"Hints are unavailable: {e}")
+    except (ValueError, StopIteration):
+        print("Hint: no code matches all of the feedback so far.")
+
+
+# --- Game Session ---
+
+class GuessResult(NamedTuple):
+    """What GameSession.submit_guess() reports for one guess."""
+    guess: int
+    black: int
+    white: int
+    positions: List[str] # guess_position() pattern: "B", "W" or "X" per peg
+    attempt: int # 1-based number of this guess
+    won: bool
+    over: bool # Won, or out of attempts
+    secret: Optional[int] # Revealed once the game is over
+
+
+class GameSession:
+    """One game's state, with no input or output: feed it guesses, get results back.
+
+    The turns are packed into one bytes object (the guess code then the
+    encode_feedback() byte, per turn) and the config is shared, so an idle session
+    is a couple of hundred bytes and a server can keep a million of them.
+    """
+
+    __slots__ = ("config", "secret", "_turns")
+
+    def __init__(self, config: GameConfig = DEFAULT_CONFIG, secret: Optional[int] = None,
+                 rng: Optional[random.Random] = None):
+        self.config = config
+        self.secret = generate_secret_code(config, rng) if secret is None else secret
+        self._turns = b""
+
+    def _turn_size(self) -> int:
+        return (self.config.n_codes - 1).bit_length() // 8 + 2 # Guess bytes plus the feedback byte
+
+    @property
+    def attempts(self) -> int:
+        return len(self._turns) // self._turn_size()
+
+    @property
+    def won(self) -> bool:
+        return self._turns[-1:] == bytes([encode_feedback(self.config.code_length, 0, self.config)])
+
+    @property
+    def over(self) -> bool:
+        return self.won or self.attempts >= self.config.max_attempts
+
+    def history(self) -> List[Tuple[int, int, int]]:
+        """(guess, black, white) for every attempt so far."""
+        size = self._turn_size()
+        turns = []
+        for start in range(0, len(self._turns), size):
+            guess = int.from_bytes(self._turns[start:start + size - 1], "little")
+            turns.append((guess, *decode_feedback(self._turns[start + size - 1], self.config)))
+        return turns
+
+    def submit_guess(self, guess: Union[str, int]) -> GuessResult:
+        """Scores a guess (a code or text for parse_guess); raises ValueError if it is invalid or the game is over."""
+        config = self.config
+        if self.over:
+            raise ValueError("The game is over.")
+        if isinstance(guess, str):
+            code = parse_guess(guess, config)
+            if code is None:
+                raise ValueError(f"Invalid guess. Enter {config.code_length} colors using letters from {list(config.colors)}.")
+            guess = code
+        else:
+            try:
+                guess = operator.index(guess) # Also takes NumPy integers, e.g. from iter_candidates
+            except TypeError:
+                raise ValueError(f"Guess {guess!r} is not a code.") from None
+            if not 0 <= guess < config.n_codes:
+                raise ValueError(f"Guess {guess} is not a code on a {config.label} board.")
+
+        black, white = score_guess(self.secret, guess, config)
+        size = self._turn_size()
+        self._turns += guess.to_bytes(size - 1, "little") + bytes([encode_feedback(black, white, config)])
+        won = black == config.code_length
+        over = won or self.attempts >= config.max_attempts
+        return GuessResult(guess, black, white, guess_position(self.secret, guess, config),
+                           self.attempts, won, over, self.secret if over else None)
+
+
+def play_game(username: str, config: GameConfig = DEFAULT_CONFIG) -> Tuple[int, bool]:
+    """Plays a GameSession on the console; returns (attempts_used, won)."""
+    session = GameSession(config)
+    print(f"\n=== Mastermind: Guess the {config.code_length}-color code ===")
     print(
-        f"Colors: {', '.join(COLORS)} (use letters). Code length: {CODE_LENGTH}.")
-    print(f"You have {MAX_ATTEMPTS} attempts. Repeats allowed.")
-
-    attempts_used = 0
-    for attempt in range(1, MAX_ATTEMPTS + 1):
-        attempts_used = attempt
-        while True:
-            raw = input(f"Attempt {attempt}/{MAX_ATTEMPTS} - Enter your guess: ")
-            guess = parse_guess(raw)
-            if guess is None:
-                print(
-                    f"Invalid guess. Enter {CODE_LENGTH} colors using letters from {COLORS}.")
-                continue
-            break
+        f"Colors: {', '.join(config.colors)} (use letters). Code length: {config.code_length}.")
+    print(f"You have {config.max_attempts} attempts. Repeats allowed.")
+    print("Type HINT for a suggested guess.")
+
+    # A CandidateSet caches n_codes-sized masks per guess, so large boards stream instead
+    if config.n_codes <= MAX_BITSET_CODES:
+        candidates = CandidateSet(config)
+    elif np is not None:
+        candidates = StreamingCandidates(config)
+    else:
+        candidates = None # Without NumPy only small boards count the possible codes
+    while True:
+        raw = input(f"Attempt {session.attempts + 1}/{config.max_attempts} - Enter your guess: ")
+        if raw.strip().upper() == "HINT":
+            show_hint(session.history(), config)
+            continue
+        try:
+            result = session.submit_guess(raw)
+        except ValueError as e:
+            print(e)
+            continue
 
-        black, white = score_guess(secret, guess)
-        guess_colors = guess_position(secret, guess)
-        print(f"Feedback -> Black pegs (correct color+position): {black}, White pegs (correct color/wrong position): {white}")
-        print(f"Color Arrangement: {guess_colors}")
+        print(f"Feedback -> Black pegs (correct color+position): {result.black}, White pegs (correct color/wrong position): {result.white}")
+        print(f"Color Arrangement: {result.positions}")
+        if candidates is not None:
+            if result.guess not in candidates:
+                print("Note: that guess could not have been the code, given your earlier feedback.")
+            candidates.narrow(result.guess, result.black, result.white)
 
-        if black == CODE_LENGTH:
+        if result.won:
             print("You Win! 🎉")
-            return attempts_used, True
+            return result.attempt, True
+        if result.over:
+            print("Game Over! Code was: " + decode_code(result.secret, config))
+            return result.attempt, False
+        if candidates is not None:
+            print(f"Possible codes remaining: {len(candidates)}")
+
 
-    print("Game Over! Code was: " + "".join(secret))
-    return attempts_used, False
+def choose_variant() -> GameConfig:
+    """Asks which board to play; pressing Enter keeps the classic game."""
+    print("\nChoose a variant:")
+    for key, (name, config) in VARIANTS.items():
+        print(f"[{key}] {name} - {config.label}, {config.max_attempts} attempts")
+    choice = input("Variant (Enter for Classic): ").strip()
+    return VARIANTS.get(choice, VARIANTS["1"])[1]
 
 
 # --- Player Game History Management Functions ---
 
 def load_game_history() -> List[Tuple[str, str, int]]:
     """Loads game history from the file: (Date, Username, Score)"""
-    history = []
     try:
-        with open(GAME_HISTORY_FILE, "r", encoding="utf-8") as f:
-            for line in f:
-                line = line.strip()
-                if not line:
-                    continue
-                try:
-                    date, user, score = line.split(",", 2)
-                    history.append((date, user, int(score)))
-                except ValueError:
-                    continue
-    except FileNotFoundError:
-        pass
+        return storage().load_game_history()
     except IOError:
-        pass
-    return history
+        return []
 
 
-def save_game_result(username: str, score: int) -> None:
-    """Appends a new game result to the history file."""
+def save_game_result(username: str, score: int, won: bool = True) -> None:
+    """Queues a new game result for the history file; the background writer saves it."""
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    line = f"{timestamp},{username},{score}\n"
     try:
-        os.makedirs(os.path.dirname(GAME_HISTORY_FILE) or ".", exist_ok=True)
-        with open(GAME_HISTORY_FILE, "a", encoding="utf-8") as f:
-            f.write(line)
+        result_writer().append_game(storage(), timestamp, username, score, won)
     except IOError as e:
         print(f"Error writing game history: {e}")
 
 
-def display_game_history() -> None:
-    """Displays the entire game history sorted by date (most recent first)."""
-    history = load_game_history()
-    if not history:
-        print("\nNo game history recorded yet.")
-        return
+def display_game_history(page_size: int = HISTORY_PAGE_SIZE) -> None:
+    """Displays the game history most recent first, one page at a time."""
+    backend, writer = storage(), result_writer()
+    stored = None
+    try:
+        with writer.holding_writes():
+            pending = [game[:3] for game in reversed(writer.pending_games(backend))]
+            stored = backend.iter_recent_games()
+            # Start reading the stored games now: anything flushed later lands after
+            # this point, so a pending game can't show up twice
+            first = list(itertools.islice(stored, 1))
+        records = itertools.chain(pending, first, stored)
+        page = list(itertools.islice(records, page_size))
+        if not page:
+            print("\nNo game history recorded yet.")
+            return
+
+        print("\n📜 === Game History (Most Recent First) ===")
+        print(f"{'Date':<19} | {'Username':<15} | {'Attempts':<8}")
+        print("-" * 46)
+        while page:
+            for date, user, score in page:
+                # Display the date part only for a cleaner look
+                display_date = date.split(' ')[0]
+                print(f"{display_date:<19} | {user:<15} | {score:<8}")
+            # Read one page ahead so we only offer "next" when there is one
+            page = list(itertools.islice(records, page_size))
+            if page:
+                try:
+                    choice = input("[N] Next page, Enter to go back: ").strip().upper()
+                except (KeyboardInterrupt, EOFError):
+                    choice = ""
+                if choice != "N":
+                    break
+        print("=" * 46)
+    except IOError as e:
+        print(f"Error reading game history: {e}")
+    finally:
+        if stored is not None:
+            stored.close() # Releases the file the generator is reading
+
+
+def recent_games(limit: int) -> List[Tuple[str, str, int]]:
+    """The newest `limit` (date, username, score) games, queued ones included."""
+    backend, writer = storage(), result_writer()
+    with writer.holding_writes():
+        pending = [game[:3] for game in reversed(writer.pending_games(backend))]
+        if len(pending) >= limit:
+            return pending[:limit]
+        stored = backend.iter_recent_games()
+        try:
+            return pending + list(itertools.islice(stored, limit - len(pending)))
+        finally:
+            stored.close()
 
-    # Sort history by date (first element in the tuple) in descending order
-    sorted_history = sorted(history, key=lambda x: x[0], reverse=True)
 
-    print("\n📜 === Game History (Most Recent First) ===")
-    print(f"{'Date':<19} | {'Username':<15} | {'Attempts':<8}")
-    print("-" * 46)
-    for date, user, score in sorted_history:
-        # Display the date part only for a cleaner look
-        display_date = date.split(' ')[0]
-        print(f"{display_date:<19} | {user:<15} | {score:<8}")
-    print("=" * 46)
+def player_stats(username: str) -> Optional[PlayerStats]:
+    """The player's rollup plus any games the writer hasn't saved yet; raises IOError."""
+    backend, writer = storage(), result_writer()
+    with writer.holding_writes():
+        stats = backend.get_player_stats(username)
+        pending = [game for game in writer.pending_games(backend) if game[1] == username]
+    for timestamp, _, score, won in pending:
+        stats = (stats or PlayerStats()).add(timestamp, score, won)
+    return stats
+
+
+def display_player_profile(username: str) -> None:
+    """Shows the player's totals from the stats rollup (no history scan)."""
+    try:
+        stats = player_stats(username)
+    except IOError as e:
+        print(f"Error reading player stats: {e}")
+        return
+    if stats is None:
+        print(f"\nNo games recorded yet for {username}.")
+        return
+
+    print(f"\n👤 === Profile: {username} ===")
+    print(f"Games played: {stats.games}  Wins: {stats.wins} ({stats.win_rate:.0%})")
+    print(f"Average attempts per win: {stats.average_attempts:.2f}")
+    print(f"Current win streak: {stats.streak}  Best streak: {stats.best_streak}")
+    print(f"Last played: {stats.last_played}")
 
 
 # --- Leaderboard Functions ---
 
 def load_highscores() -> Dict[str, int]:
-    scores = {}
     try:
-        with open(HIGHSCORES_FILE, "r", encoding="utf-8") as f:
-            for line in f:
-                line = line.strip()
-                if not line:
-                    continue
-                try:
-                    user, s = line.split(",", 1)
-                    scores[user] = int(s)
-                except ValueError:
-                    continue
-    except FileNotFoundError:
-        pass
+        return storage().load_highscores()
     except IOError:
-        pass
-    return scores
+        return {}
 
 
 def save_highscores(scores: Dict[str, int]) -> None:
     try:
-        with open(HIGHSCORES_FILE, "w", encoding="utf-8") as f:
-            for user, s in scores.items():
-                f.write(f"{user},{s}\n")
+        storage().save_highscores(scores)
     except IOError as e:
         print(f"Error writing highscores: {e}")
 
 
+def improve_highscore(username: str, score: int) -> Tuple[bool, Optional[int]]:
+    """Queues score as the user's highscore if it beats the old one; returns (improved, old)."""
+    backend = storage()
+    prev = result_writer().pending_highscores(backend).get(username)
+    if prev is None:
+        try:
+            prev = backend.get_highscore(username)
+        except IOError:
+            prev = None
+    if prev is not None and score >= prev:
+        return False, prev
+    # The backend compares again when the write lands, under its lock
+    result_writer().improve_highscore(backend, username, score)
+    return True, prev
+
+
 def update_leaderboard(username: str, score: int) -> None:
-    scores = load_highscores()
-    prev = scores.get(username)
+    try:
+        improved, prev = improve_highscore(username, score)
+    except IOError as e:
+        print(f"Error writing highscores: {e}")
+        return
 
-    if prev is None or score < prev:
-        scores[username] = score
-        save_highscores(scores)
+    if improved:
         if prev is None:
             print(f"New highscore added for {username}: {score}")
         else:
@@ -493,22 +1145,54 @@ def update_leaderboard(username: str, score: int) -> None:
             f"No leaderboard update: {username}'s best is {prev}, your score was {score}")
 
 
+def top_highscores(k: int = 5) -> List[Tuple[str, int]]:
+    """The k best (username, score) pairs, queued highscores included."""
+    backend = storage()
+    # Pending scores only ever improve on stored ones, so they can push at most
+    # len(pending) stored entries out of the top k
+    pending = result_writer().pending_highscores(backend)
+    try:
+        top_scores = backend.top_scores(k + len(pending))
+    except IOError:
+        top_scores = []
+    best = dict(top_scores)
+    best.update(pending)
+    return sorted(best.items(), key=lambda item: (item[1], item[0]))[:k]
+
+
 def display_top5() -> None:
-    scores = load_highscores()
-    if not scores:
+    top_scores = top_highscores(5)
+    if not top_scores:
         print("No highscores yet.")
         return
 
-    # Sort by score (ascending) then by username (alphabetical)
-    sorted_scores = sorted(scores.items(), key=lambda kv: (kv[1], kv[0]))
+    # Sorted by score (ascending) then by username (alphabetical)
     print("\n🏆 === Top 5 Leaderboard (Fewer Attempts is Better) ===")
-    for i, (user, s) in enumerate(sorted_scores[:5], start=1):
+    for i, (user, s) in enumerate(top_scores, start=1):
         print(f"{i}. {user} - {s} attempts")
     print("=======================================================")
 
 
 # --- Main Menu Function ---
 
+def play_round(username: str) -> None:
+    """Plays one game for a logged-in user, saves it and shows the standings."""
+    config = choose_variant()
+    attempts, won = play_game(username, config)
+    # Game completed, always save the result
+    save_game_result(username, attempts, won)
+
+    # Only update leaderboard if a classic game was won, so attempt
+    # counts from the bigger boards don't mix with classic ones
+    if won and config == DEFAULT_CONFIG:
+        update_leaderboard(username, attempts)
+
+    # Display leaderboard, profile and history automatically after any game
+    display_top5()
+    display_player_profile(username)
+    display_game_history()
+
+
 def main_menu() -> None:
     """Displays the main menu and handles user choices."""
     while True:
@@ -516,32 +1200,37 @@ def main_menu() -> None:
         print("[R] Register")
         print("[L] Login & Play")
         print("[F] Forgot Password")
+        print("[O] Logout")
         print("[E] Exit")
         choice = input("Your choice: ").strip().upper()
 
         if choice == "R":
             register_user()
         elif choice == "L":
-            success, username = login_user()
-            if success:
-                attempts, won = play_game(username)
-                # Game completed, always save the result
-                save_game_result(username, attempts)
-               
-                # Only update leaderboard if the game was won
-                if won:
-                    update_leaderboard(username, attempts)
-               
-                # Display leaderboard and history automatically after any game
-                display_top5()
-                display_game_history()
+            username = resume_session()
+            if username:
+                print(f"\nWelcome back, {username}! (Choose [O] to log out.)")
+            else:
+                success, username = login_user()
+                if not success:
+                    continue
+                start_session(username)
+            while True:
+                play_round(username)
+                if input("Play again? (Y/N): ").strip().upper() != "Y":
+                    break
+                if resume_session() != username:
+                    print("Your session has ended. Please log in again.")
+                    break
         elif choice == "F":
             forgot_password()
+        elif choice == "O":
+            logout(SESSIONS_FILE)
         elif choice == "E":
             print("Exiting application. Goodbye! 👋")
             break
         else:
-            print("Invalid choice. Please enter R, L, F, or E.")
+            print("Invalid choice. Please enter R, L, F, O, or E.")
 
 
 # --- Call-Out the Main Menu Function ---
@@ -552,3 +1241,5 @@ if __name__ == "__main__":
     except KeyboardInterrupt:
         print("\nInterrupted. Goodbye! 👋")
         sys.exit(0)
+    finally:
+        close_result_writer() # Save any queued results before the process ends
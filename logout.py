@@ -1,10 +1,21 @@
 # logout.py
 
-def logout():
+from mastermind_sessions import SESSIONS_FILE, get_session_store, read_current_token, write_current_token
+
+
+def logout(sessions_path=SESSIONS_FILE):
     try:
-        # Clear the session (remove logged-in user)
-        with open("session.txt", "w") as session_file:
-            session_file.write("")
+        token = read_current_token()
+        if token is None:
+            print("\n⚠️ No session found. You are not logged in.\n")
+            return
+        # Revoke the token so it can't be resumed, then clear the session (remove logged-in user)
+        get_session_store(sessions_path).revoke(token)
+        write_current_token("")
         print("\n✅ You have been successfully logged out.\n")
-    except FileNotFoundError:
-        print("\n⚠️ No session found. You are not logged in.\n")
+    except IOError as e:
+        print(f"\n⚠️ Error logging out: {e}\n")
+
+
+if __name__ == "__main__":
+    logout()
@@ -0,0 +1,265 @@
+"""Micro- and macro-benchmarks for the game's hot paths, written out as JSON.
+
+Examples:
+    python mastermind_benchmarks.py --output bench.json
+    python mastermind_benchmarks.py --quick --compare bench.json
+The second form exits with status 1 if any benchmark got slower than --threshold.
+"""
+
+import argparse
+import collections
+import contextlib
+import io
+import itertools
+import json
+import os
+import platform
+import random
+import string
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List
+
+import Group3_Mastermind_Project_Final as mastermind
+import mastermind_credentials
+import mastermind_storage
+
+
+FULL_SIZES = {"players": [1000, 100000, 1000000], "highscores": [1000, 100000, 1000000],
+              "history": [100000, 1000000, 3000000]}
+QUICK_SIZES = {"players": [1000, 100000], "highscores": [1000, 100000], "history": [100000]}
+
+
+def _time_call(fn: Callable[[], object], number: int, repeat: int = 3) -> float:
+    """Returns the best per-call time in seconds over `repeat` runs of `number` calls."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+
+def _record(results: List[Dict], name: str, seconds: float, **params) -> None:
+    results.append({"name": name, "params": params, "seconds_per_call": seconds})
+    label = ", ".join(f"{k}={v}" for k, v in params.items())
+    print(f"{name:<28} {label:<28} {seconds * 1e6:>14.2f} us/call", file=sys.stderr)
+
+
+def _username(i: int) -> str:
+    return f"user{i:07d}"
+
+
+def _write_players(path: str, n: int) -> None:
+    # Hashing every user would take hours at real KDF costs, so only the last one,
+    # the user the login benchmarks use, gets an entry in the current scheme
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(n - 1):
+            f.write(f"{_username(i)},{mastermind.caesar_encrypt('pw' + str(i))}\n")
+        f.write(f"{_username(n - 1)},{mastermind_credentials.hash_password('pw' + str(n - 1))}\n")
+
+
+def _write_highscores(path: str, n: int) -> None:
+    rng = random.Random(n)
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(n):
+            f.write(f"{_username(i)},{rng.randint(1, mastermind.MAX_ATTEMPTS)}\n")
+
+
+def _write_history(path: str, n: int) -> None:
+    rng = random.Random(n)
+    moment = datetime(2024, 1, 1)
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(n):
+            moment += timedelta(seconds=rng.randint(1, 120))
+            f.write(f"{moment:%Y-%m-%d %H:%M:%S},{_username(rng.randrange(10000))},"
+                    f"{rng.randint(1, mastermind.MAX_ATTEMPTS)}\n")
+
+
+def bench_engine(results: List[Dict]) -> None:
+    rng = random.Random(0)
+    config = mastermind.DEFAULT_CONFIG
+    pairs = [(rng.randrange(config.n_codes), rng.randrange(config.n_codes)) for _ in range(1000)]
+    raw_guesses = ["RGBY", "r g b y", "red, green, blue, yellow", "RGBX"]
+    passwords = ["".join(rng.choices(string.ascii_letters + string.digits, k=12)) for _ in range(1000)]
+
+    def each(fn, items):
+        return lambda: [fn(*item) for item in items]
+
+    _record(results, "score_guess", _time_call(each(mastermind.score_guess, pairs), 20) / len(pairs))
+    _record(results, "guess_position", _time_call(each(mastermind.guess_position, pairs), 20) / len(pairs))
+    _record(results, "parse_guess",
+            _time_call(each(mastermind.parse_guess, [(g,) for g in raw_guesses] * 250), 20) / 1000)
+    _record(results, "caesar_encrypt",
+            _time_call(each(mastermind.caesar_encrypt, [(p,) for p in passwords]), 20) / len(passwords))
+    for scheme in ("scrypt", "pbkdf2-sha256"):
+        stored = mastermind_credentials.hash_password(passwords[0], scheme)
+        _record(results, "verify_password", _time_call(
+            lambda: mastermind_credentials.verify_password(passwords[0], stored), 1), scheme=scheme)
+
+
+def bench_players(results: List[Dict], workdir: str, sizes: List[int]) -> None:
+    for n in sizes:
+        path = os.path.join(workdir, f"players_{n}.txt")
+        _write_players(path, n)
+        mastermind.PLAYERS_FILE = path
+        number = max(1, 100000 // n)
+        last = _username(n - 1)
+
+        _record(results, "check_username_exists", _time_call(
+            lambda: mastermind.check_username_exists(last), number), users=n, case="last")
+        _record(results, "check_username_exists", _time_call(
+            lambda: mastermind.check_username_exists("nobody"), number), users=n, case="missing")
+
+        # login_user is interactive, so feed it the username and password directly.
+        answers = iter(())
+        mastermind.input = lambda prompt="": next(answers)
+        mastermind.get_password_with_asterisks = lambda prompt="": "pw" + str(n - 1)
+
+        def login():
+            nonlocal answers
+            answers = iter([last])
+            return mastermind.login_user()
+
+        # The user's entry is already in the current scheme, so no login triggers an
+        # upgrade and every size times the same verification
+        with contextlib.redirect_stdout(io.StringIO()):
+            _record(results, "login_user", _time_call(login, min(number, 10)), users=n)
+
+        # What a fresh process pays for its first lookup: parse the file, or map the index
+        _record(results, "first_lookup", _time_call(
+            lambda: mastermind_storage.PlayersRepository(path).exists(last), 1), users=n, source="text")
+        mastermind_storage.UserDirectory.build(path)
+
+        def first_directory_lookup():
+            directory = mastermind_storage.UserDirectory(path)
+            return directory.is_current() and directory.get_password(last)
+
+        _record(results, "first_lookup", _time_call(first_directory_lookup, 1), users=n, source="directory")
+        mastermind.storage().directory._missing_until = 0.0 # Notice the new build right away
+        _record(results, "check_username_exists_directory", _time_call(
+            lambda: mastermind.check_username_exists(last), number), users=n, case="last")
+        with contextlib.redirect_stdout(io.StringIO()):
+            _record(results, "login_user_directory", _time_call(login, min(number, 10)), users=n)
+        del mastermind.input
+        os.remove(path)
+        os.remove(mastermind_storage.UserDirectory.path_for(path))
+
+
+def bench_leaderboard(results: List[Dict], workdir: str, sizes: List[int]) -> None:
+    for n in sizes:
+        path = os.path.join(workdir, f"highscores_{n}.txt")
+        number = max(1, 10000 // n)
+        mastermind.HIGHSCORES_FILE = path
+        with contextlib.redirect_stdout(io.StringIO()):
+            _write_highscores(path, n)
+            # A new player each call, so every call takes the update-and-save path.
+            counter = iter(range(n, n + 1000000))
+
+            def update_and_save():
+                mastermind.update_leaderboard(_username(next(counter)), 1)
+                mastermind.result_writer().flush() # Until it is on disk, as the old synchronous write
+
+            _record(results, "update_leaderboard", _time_call(update_and_save, number), entries=n)
+            # What a player waits for: the update is queued and written behind
+            _record(results, "update_leaderboard_queued", _time_call(
+                lambda: mastermind.update_leaderboard(_username(next(counter)), 1), number), entries=n)
+            mastermind.result_writer().flush()
+            _write_highscores(path, n)
+            _record(results, "display_top5", _time_call(mastermind.display_top5, number), entries=n)
+        os.remove(path)
+
+
+def bench_history(results: List[Dict], workdir: str, sizes: List[int]) -> None:
+    for n in sizes:
+        path = os.path.join(workdir, f"history_{n}.txt")
+        _write_history(path, n)
+        mastermind.GAME_HISTORY_FILE = path
+        _record(results, "load_game_history", _time_call(mastermind.load_game_history, 1), lines=n)
+
+        def latest_page():
+            records = mastermind.storage().iter_recent_games()
+            page = list(itertools.islice(records, mastermind.HISTORY_PAGE_SIZE))
+            records.close()
+            return page
+
+        _record(results, "history_latest_page", _time_call(latest_page, 100), lines=n)
+
+        binary_path = os.path.join(workdir, f"history_{n}.bin")
+        mastermind_storage.convert_text_history(path, binary_path, mastermind.MAX_ATTEMPTS)
+        history = mastermind_storage.BinaryHistory(binary_path)
+        # Every record decoded, to compare with load_game_history; opening alone is lazy
+        _record(results, "iterate_game_history_binary",
+                _time_call(lambda: collections.deque(history.load(), 0), 1), lines=n)
+        _record(results, "open_game_history_binary", _time_call(history.load, 1), lines=n)
+        os.remove(path)
+        os.remove(binary_path)
+        os.remove(binary_path + ".names")
+
+
+def run_benchmarks(quick: bool = False) -> Dict:
+    sizes = QUICK_SIZES if quick else FULL_SIZES
+    results: List[Dict] = []
+    saved = (mastermind.PLAYERS_FILE, mastermind.HIGHSCORES_FILE, mastermind.GAME_HISTORY_FILE,
+             mastermind.get_password_with_asterisks)
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            bench_engine(results)
+            bench_players(results, workdir, sizes["players"])
+            bench_leaderboard(results, workdir, sizes["highscores"])
+            bench_history(results, workdir, sizes["history"])
+    finally:
+        (mastermind.PLAYERS_FILE, mastermind.HIGHSCORES_FILE, mastermind.GAME_HISTORY_FILE,
+         mastermind.get_password_with_asterisks) = saved
+    return {
+        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "quick": quick,
+        "results": results,
+    }
+
+
+def _key(result: Dict) -> str:
+    return result["name"] + json.dumps(result["params"], sort_keys=True)
+
+
+def compare(previous: Dict, current: Dict, threshold: float) -> bool:
+    """Prints the per-benchmark ratio new/old; returns False if any exceeds 1 + threshold."""
+    old = {_key(r): r["seconds_per_call"] for r in previous["results"]}
+    ok = True
+    print(f"\n{'Benchmark':<60} {'Ratio':>7}")
+    for result in current["results"]:
+        before = old.get(_key(result))
+        if not before:
+            continue
+        ratio = result["seconds_per_call"] / before
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  REGRESSION"
+            ok = False
+        print(f"{_key(result):<60} {ratio:>7.2f}{flag}")
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark Mastermind hot paths.")
+    parser.add_argument("--output", default="bench_output.json", help="where to write the JSON results")
+    parser.add_argument("--quick", action="store_true", help="skip the largest data sizes")
+    parser.add_argument("--compare", help="earlier JSON results to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="allowed slowdown before a benchmark counts as a regression")
+    args = parser.parse_args()
+
+    report = run_benchmarks(args.quick)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            if not compare(json.load(f), report, args.threshold):
+                sys.exit(1)
@@ -0,0 +1,135 @@
+"""Non-interactive bulk import and export of players as "username,password" CSV.
+
+Examples:
+    python mastermind_bulk.py import new_users.csv
+    python mastermind_bulk.py export users.csv
+    python mastermind_bulk.py import users.csv --hashed    # a file written by export
+
+An import reads the CSV once, skips usernames that are already registered (or
+repeated in the file), hashes the passwords on the KDF pool and adds every new
+user with one write. Plain-text passwords cost one KDF each, so a large import
+is bound by the configured hash cost and the number of cores; an export keeps
+the stored hashes, and importing it with --hashed only copies them.
+"""
+
+import argparse
+import csv
+import os
+import sys
+import time
+from concurrent.futures import Future
+from typing import Dict, Iterator, List, Optional, TextIO, Tuple
+
+from mastermind_credentials import hash_password, kdf_pool
+from mastermind_storage import StorageBackend, TextFileStorage, UserDirectory, get_storage, valid_username
+
+HEADER = ["username", "password"]
+CHUNK_SIZE = 256 # Passwords per task on the KDF pool
+
+
+def _hash_chunk(passwords: List[str], scheme: Optional[str]) -> List[str]:
+    return [hash_password(password, scheme) for password in passwords]
+
+
+def _read_users(f: TextIO, counts: Dict[str, int], hashed: bool) -> Iterator[Tuple[str, str]]:
+    """Yields valid (username, password) rows; counts the invalid ones."""
+    for row in csv.reader(f):
+        if row == HEADER or not row:
+            continue
+        if len(row) != 2:
+            counts["invalid"] += 1
+            continue
+        username, password = row[0].strip().lower(), row[1]
+        # The username is written as is on a "username,password" line of the players
+        # file; a plain-text password is only hashed, but a stored one is copied too
+        if not valid_username(username) or not password or (
+                hashed and ("," in password or not password.isprintable())):
+            counts["invalid"] += 1
+            continue
+        yield username, password
+
+
+def import_users(backend: StorageBackend, f: TextIO, hashed: bool = False,
+                 scheme: Optional[str] = None) -> Dict[str, int]:
+    """Adds the users in a CSV; returns counts of added, existing, duplicate and invalid rows.
+
+    With hashed=True the password column holds stored entries (as written by
+    export_users) and is copied as is.
+    """
+    counts = {"added": 0, "existing": 0, "duplicate": 0, "invalid": 0}
+    existing = set(backend.usernames())
+    seen = set()
+    names: List[str] = []
+    stored: List[str] = []
+    chunks: List[Future] = []
+    passwords: List[str] = []
+
+    for username, password in _read_users(f, counts, hashed):
+        if username in existing:
+            counts["existing"] += 1
+            continue
+        if username in seen:
+            counts["duplicate"] += 1 # The first row for a username wins
+            continue
+        seen.add(username)
+        names.append(username)
+        if hashed:
+            stored.append(password)
+            continue
+        passwords.append(password)
+        if len(passwords) == CHUNK_SIZE:
+            # Hash while the rest of the file is read; hashlib releases the GIL
+            chunks.append(kdf_pool().submit(_hash_chunk, passwords, scheme))
+            passwords = []
+    if passwords:
+        chunks.append(kdf_pool().submit(_hash_chunk, passwords, scheme))
+    for chunk in chunks:
+        stored.extend(chunk.result())
+
+    counts["added"] = backend.add_users(list(zip(names, stored)))
+    counts["existing"] += len(names) - counts["added"] # Registered by someone else meanwhile
+    if isinstance(backend, TextFileStorage) and os.path.exists(UserDirectory.path_for(backend.players.path)):
+        UserDirectory.build(backend.players.path) # Rather than leave every new user in its tail
+    return counts
+
+
+def export_users(backend: StorageBackend, f: TextIO) -> int:
+    """Writes every user and stored password as CSV; returns the number written."""
+    writer = csv.writer(f, lineterminator="\n")
+    writer.writerow(HEADER)
+    n = 0
+    for user in backend.users():
+        writer.writerow(user)
+        n += 1
+    return n
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk import or export Mastermind players as CSV.")
+    parser.add_argument("command", choices=["import", "export"])
+    parser.add_argument("csv", help='CSV file, or "-" for stdin/stdout')
+    parser.add_argument("--hashed", action="store_true",
+                        help="the password column holds stored entries, as written by export")
+    parser.add_argument("--scheme", choices=["scrypt", "pbkdf2-sha256"],
+                        help="hash scheme for plain-text passwords (default: $MASTERMIND_PASSWORD_SCHEME or scrypt)")
+    parser.add_argument("--storage", default=os.environ.get("MASTERMIND_STORAGE", "text"),
+                        help='"text", "binary[:<path>]" or "sqlite:<path>" (default: $MASTERMIND_STORAGE or text)')
+    parser.add_argument("--players", default="players.txt", help="players file for the text backends")
+    args = parser.parse_args()
+
+    backend = get_storage(args.storage, args.players, "highscores.txt", "game_history.txt")
+    start = time.perf_counter()
+    try:
+        if args.command == "import":
+            with (open(args.csv, newline="", encoding="utf-8") if args.csv != "-" else sys.stdin) as f:
+                counts = import_users(backend, f, args.hashed, args.scheme)
+            print(f"Added {counts['added']} users; skipped {counts['existing']} already registered, "
+                  f"{counts['duplicate']} repeated and {counts['invalid']} invalid rows "
+                  f"in {time.perf_counter() - start:.1f}s")
+        else:
+            with (open(args.csv, "w", newline="", encoding="utf-8") if args.csv != "-" else sys.stdout) as f:
+                n = export_users(backend, f)
+            print(f"Exported {n} users in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+    except IOError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
@@ -0,0 +1,198 @@
+"""Stored password formats and the worker pool that runs the key derivation.
+
+A stored password is one of:
+    $scrypt$<log2 N>$<r>$<p>$<salt>$<key>        salted scrypt (the default)
+    $pbkdf2-sha256$<iterations>$<salt>$<key>     salted PBKDF2-HMAC-SHA256
+    64 hex digits                                legacy unsalted SHA-256 (or Caesar)
+    anything else                                legacy Caesar cipher
+Salts and keys are base64. Legacy entries still verify, and needs_upgrade() tells
+the caller to re-hash them with the current scheme after a successful login.
+
+The KDF costs come from the environment, so they can be tuned per host:
+    MASTERMIND_PASSWORD_SCHEME      scrypt or pbkdf2-sha256 (default scrypt)
+    MASTERMIND_SCRYPT_LOG2_N        default 14 (16 MiB per hash with r=8)
+    MASTERMIND_PBKDF2_ITERATIONS    default 600000
+Run this file to time the costs on this machine:
+    python mastermind_credentials.py --target-ms 100
+"""
+
+import argparse
+import base64
+import hashlib
+import hmac
+import os
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional
+
+CAESAR_SHIFT = 7
+SCHEME = os.environ.get("MASTERMIND_PASSWORD_SCHEME", "scrypt")
+SCRYPT_LOG2_N = int(os.environ.get("MASTERMIND_SCRYPT_LOG2_N", "14"))
+SCRYPT_R = 8
+SCRYPT_P = 1
+PBKDF2_ITERATIONS = int(os.environ.get("MASTERMIND_PBKDF2_ITERATIONS", "600000"))
+SALT_BYTES = 16
+KEY_BYTES = 32
+
+
+# --- Legacy Formats ---
+
+def caesar_encrypt(password: str, shift: int = CAESAR_SHIFT) -> str:
+    """Implements a Caesar cipher for letters (A-Z, a-z) and digits (0-9)."""
+    enc = []
+    for ch in password:
+        if ch.isalpha():
+            base = ord("A") if ch.isupper() else ord("a")
+            rotated = chr((ord(ch) - base + shift) % 26 + base)
+            enc.append(rotated)
+        elif ch.isdigit():
+            rotated = chr((ord(ch) - ord("0") + shift) % 10 + ord("0"))
+            enc.append(rotated)
+        else:
+            enc.append(ch)
+    return "".join(enc)
+
+
+def _is_sha256_hex(stored: str) -> bool:
+    return len(stored) == 64 and all(ch in "0123456789abcdefABCDEF" for ch in stored)
+
+
+VERSIONED_SCHEMES = ("scrypt", "pbkdf2-sha256")
+
+
+def scheme_of(stored: str) -> str:
+    """Names a stored password's format: scrypt, pbkdf2-sha256, sha256 or caesar."""
+    # Only the exact prefixes: caesar_encrypt leaves "$" alone, so a legacy entry may start with one
+    for scheme in VERSIONED_SCHEMES:
+        if stored.startswith(f"${scheme}$"):
+            return scheme
+    return "sha256" if _is_sha256_hex(stored) else "caesar"
+
+
+# --- Key Derivation ---
+
+def _b64(data: bytes) -> str:
+    return base64.b64encode(data).decode("ascii").rstrip("=")
+
+
+def _unb64(text: str) -> bytes:
+    return base64.b64decode(text + "=" * (-len(text) % 4))
+
+
+def _scrypt(password: str, salt: bytes, log2_n: int, r: int, p: int) -> bytes:
+    n = 1 << log2_n
+    return hashlib.scrypt(password.encode("utf-8"), salt=salt, n=n, r=r, p=p,
+                          maxmem=256 * r * n + (1 << 20), dklen=KEY_BYTES)
+
+
+def _pbkdf2(password: str, salt: bytes, iterations: int) -> bytes:
+    return hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, iterations, KEY_BYTES)
+
+
+def hash_password(password: str, scheme: Optional[str] = None) -> str:
+    """Hashes a password with a fresh salt in the given (default: configured) scheme."""
+    scheme = scheme or SCHEME
+    salt = os.urandom(SALT_BYTES)
+    if scheme == "scrypt":
+        key = _scrypt(password, salt, SCRYPT_LOG2_N, SCRYPT_R, SCRYPT_P)
+        return f"$scrypt${SCRYPT_LOG2_N}${SCRYPT_R}${SCRYPT_P}${_b64(salt)}${_b64(key)}"
+    if scheme == "pbkdf2-sha256":
+        key = _pbkdf2(password, salt, PBKDF2_ITERATIONS)
+        return f"$pbkdf2-sha256${PBKDF2_ITERATIONS}${_b64(salt)}${_b64(key)}"
+    raise ValueError(f"Unknown password scheme '{scheme}'")
+
+
+def verify_password(password: str, stored: str) -> bool:
+    """Checks a password against any supported stored format in constant time."""
+    scheme = scheme_of(stored)
+    try:
+        if scheme == "scrypt":
+            _, _, log2_n, r, p, salt, key = stored.split("$")
+            return hmac.compare_digest(_scrypt(password, _unb64(salt), int(log2_n), int(r), int(p)), _unb64(key))
+        if scheme == "pbkdf2-sha256":
+            _, _, iterations, salt, key = stored.split("$")
+            return hmac.compare_digest(_pbkdf2(password, _unb64(salt), int(iterations)), _unb64(key))
+    except (ValueError, TypeError):
+        return False # Corrupt entry
+    if scheme == "sha256" and hmac.compare_digest(
+            hashlib.sha256(password.encode("utf-8")).hexdigest(), stored.lower()):
+        return True
+    # A Caesar entry can also be 64 hex digits (an all-digit password, say)
+    return hmac.compare_digest(caesar_encrypt(password).encode("utf-8"), stored.encode("utf-8"))
+
+
+def needs_upgrade(stored: str) -> bool:
+    """True if the entry is legacy, in another scheme, or cheaper than the current cost."""
+    scheme = scheme_of(stored)
+    if scheme != SCHEME:
+        return True
+    parts = stored.split("$")
+    try:
+        if scheme == "scrypt":
+            return (int(parts[2]), int(parts[3]), int(parts[4])) < (SCRYPT_LOG2_N, SCRYPT_R, SCRYPT_P)
+        return int(parts[2]) < PBKDF2_ITERATIONS
+    except (IndexError, ValueError):
+        return True
+
+
+# --- Worker Pool ---
+
+# hashlib releases the GIL while scrypt/PBKDF2 run, so threads are enough to keep
+# the caller (a menu or a server's event loop) responsive and to use every core.
+_pool: Optional[ThreadPoolExecutor] = None
+
+
+def kdf_pool() -> ThreadPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ThreadPoolExecutor(max_workers=os.cpu_count() or 1, thread_name_prefix="kdf")
+    return _pool
+
+
+def submit_hash(password: str, scheme: Optional[str] = None) -> "Future[str]":
+    """hash_password() on the KDF pool."""
+    return kdf_pool().submit(hash_password, password, scheme)
+
+
+def submit_verify(password: str, stored: str) -> "Future[bool]":
+    """verify_password() on the KDF pool."""
+    return kdf_pool().submit(verify_password, password, stored)
+
+
+# --- Cost Benchmark ---
+
+def time_hash(scheme: str, cost: int, rounds: int = 3) -> float:
+    """Best-of-rounds seconds for one hash at a cost (log2 N for scrypt, iterations for PBKDF2)."""
+    salt = os.urandom(SALT_BYTES)
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        if scheme == "scrypt":
+            _scrypt("benchmark-password", salt, cost, SCRYPT_R, SCRYPT_P)
+        else:
+            _pbkdf2("benchmark-password", salt, cost)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time the password KDF costs on this machine.")
+    parser.add_argument("--target-ms", type=float, default=100.0,
+                        help="time one login may spend hashing (default: 100)")
+    args = parser.parse_args()
+
+    print(f"{'Scheme':<14} | {'Cost':>9} | {'ms/hash':>8}")
+    best_scrypt = None
+    for log2_n in range(12, 18):
+        ms = time_hash("scrypt", log2_n) * 1000
+        print(f"{'scrypt':<14} | {'N=2^' + str(log2_n):>9} | {ms:>8.1f}")
+        if ms <= args.target_ms:
+            best_scrypt = log2_n
+    ms_per_100k = time_hash("pbkdf2-sha256", 100000) * 1000
+    for iterations in (100000, 300000, 600000, 1200000):
+        print(f"{'pbkdf2-sha256':<14} | {iterations:>9} | {ms_per_100k * iterations / 100000:>8.1f}")
+
+    print(f"\nWithin {args.target_ms:.0f} ms per hash:")
+    if best_scrypt is not None:
+        print(f"  MASTERMIND_SCRYPT_LOG2_N={best_scrypt}")
+    print(f"  MASTERMIND_PBKDF2_ITERATIONS={int(args.target_ms / ms_per_100k * 100000) // 10000 * 10000}")
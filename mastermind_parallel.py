@@ -0,0 +1,130 @@
+"""Process-pool minimax guess search for boards too large for the feedback table.
+
+The candidate codes live in one shared-memory block that every worker maps, and
+the guess space is handed out as ranges of packed codes, so neither the guesses
+nor the candidates are copied per task.
+
+Run this file to benchmark throughput against the number of worker processes:
+    python mastermind_parallel.py --variant 2
+"""
+
+import argparse
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Optional, Tuple
+
+import numpy as np
+
+import Group3_Mastermind_Project_Final as mastermind
+from Group3_Mastermind_Project_Final import GameConfig
+
+
+# Per-worker state, filled in by _init_worker().
+_worker = {}
+
+
+def _init_worker(shm_name: str, n_candidates: int, board: Tuple[Tuple[str, ...], int, int]) -> None:
+    # The board comes as plain values: when the game runs as a script its GameConfig is
+    # __main__.GameConfig, which a freshly started worker can't unpickle
+    config = GameConfig(*board)
+    shm = shared_memory.SharedMemory(name=shm_name)
+    candidates = np.ndarray((n_candidates,), dtype=np.int64, buffer=shm.buf)
+    digits = mastermind.codes_to_array(candidates, config)
+    _worker.update(shm=shm, candidates=candidates, digits=digits,
+                   counts=mastermind.color_counts(digits, config), config=config)
+
+
+def _search_range(start: int, stop: int, max_block: int = 1 << 22) -> Tuple[int, int]:
+    """Returns (score, guess) for the best guess in [start, stop); lower score is better."""
+    config = _worker["config"]
+    n_colors, code_length = config.n_colors, config.code_length
+    candidates, cand_digits, cand_counts = _worker["candidates"], _worker["digits"], _worker["counts"]
+    n_feedback = (code_length + 1) ** 2
+
+    guesses = np.arange(start, stop, dtype=np.int64)
+    guess_digits = mastermind.codes_to_array(guesses, config)
+    guess_counts = mastermind.color_counts(guess_digits, config)
+    offsets = (np.arange(len(guesses), dtype=np.int64) * n_feedback)[:, None]
+
+    # partitions[g, f] = number of candidates that answer guess g with feedback f.
+    partitions = np.zeros(len(guesses) * n_feedback, dtype=np.int64)
+    step = max(1, max_block // (len(guesses) * max(n_colors, code_length)))
+    for lo in range(0, len(candidates), step):
+        hi = lo + step
+        black = (guess_digits[:, None, :] == cand_digits[None, lo:hi, :]).sum(axis=2, dtype=np.uint8)
+        common = np.minimum(guess_counts[:, None, :], cand_counts[None, lo:hi, :]).sum(axis=2, dtype=np.uint8)
+        feedback = black.astype(np.int64) * (code_length + 1) + (common - black) + offsets
+        partitions += np.bincount(feedback.ravel(), minlength=len(partitions))
+
+    worst = partitions.reshape(len(guesses), n_feedback).max(axis=1)
+    # Same tie-break as the Knuth solver: prefer possible secrets, then the lowest code.
+    is_candidate = np.isin(guesses, candidates, assume_unique=True)
+    scores = worst * 2 - is_candidate
+    best = int(np.argmin(scores))
+    return int(scores[best]), int(guesses[best])
+
+
+def _mp_context():
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+def minimax_search(candidates, config: GameConfig, workers: Optional[int] = None,
+                   chunk_size: int = 512) -> Tuple[int, int]:
+    """Finds the minimax next guess over the whole code space using a process pool.
+
+    candidates is a sorted array of packed codes still consistent with the feedback.
+    Returns (guess, worst_case_partition_size).
+    """
+    candidates = np.ascontiguousarray(candidates, dtype=np.int64)
+    n_codes = config.n_codes
+    workers = workers or os.cpu_count() or 1
+
+    shm = shared_memory.SharedMemory(create=True, size=max(1, candidates.nbytes))
+    try:
+        np.ndarray(candidates.shape, dtype=np.int64, buffer=shm.buf)[:] = candidates
+        # Not fork: the game process already runs threads (KDF pool, result writer,
+        # compactors), and a forked child can deadlock on a lock one of them held
+        with ProcessPoolExecutor(max_workers=workers, mp_context=_mp_context(), initializer=_init_worker,
+                                 initargs=(shm.name, len(candidates),
+                                           (config.colors, config.code_length, config.max_attempts))) as pool:
+            starts = range(0, n_codes, chunk_size)
+            stops = [min(n_codes, s + chunk_size) for s in starts]
+            best_score, best_guess = min(pool.map(_search_range, starts, stops))
+    finally:
+        shm.close()
+        shm.unlink()
+    return best_guess, (best_score + 1) // 2
+
+
+def benchmark(config: GameConfig, n_candidates: int, max_workers: int,
+              chunk_size: int = 512, seed: int = 0) -> None:
+    """Times minimax_search() on a fixed workload for 1..max_workers processes."""
+    rng = np.random.default_rng(seed)
+    n_codes = config.n_codes
+    candidates = np.sort(rng.choice(n_codes, size=min(n_candidates, n_codes), replace=False))
+    pairs = n_codes * len(candidates)
+
+    print(f"Board {config.label}: {n_codes} guesses x {len(candidates)} candidates")
+    print(f"{'Workers':>7} | {'Seconds':>8} | {'Pairs/s':>12} | {'Speedup':>7}")
+    baseline = None
+    for workers in range(1, max_workers + 1):
+        start = time.perf_counter()
+        minimax_search(candidates, config, workers=workers, chunk_size=chunk_size)
+        elapsed = time.perf_counter() - start
+        baseline = baseline or elapsed
+        print(f"{workers:>7} | {elapsed:>8.2f} | {pairs / elapsed:>12,.0f} | {baseline / elapsed:>6.2f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the parallel minimax guess search.")
+    parser.add_argument("--variant", choices=sorted(mastermind.VARIANTS), default="2",
+                        help="board from the game's variant menu (default: 2, 5 pegs x 8 colors)")
+    parser.add_argument("--candidates", type=int, default=2000)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk-size", type=int, default=512)
+    args = parser.parse_args()
+    benchmark(mastermind.VARIANTS[args.variant][1], args.candidates, args.max_workers, args.chunk_size)
@@ -0,0 +1,288 @@
+"""asyncio TCP server: many players at once over a line-oriented text protocol.
+
+Example:
+    python mastermind_server.py --port 4040
+    nc localhost 4040
+
+Every request is one line, a command and its arguments separated by spaces; every
+reply starts with "OK" or "ERR <message>". Replies with rows say "OK <n>" and
+send n more lines.
+    REGISTER <username> <password>
+    LOGIN <username> <password>    -> OK <session token>
+    RESUME <token>                 -> OK <username>
+    LOGOUT
+    NEW [variant]                  -> OK <colors> <code length> <attempts>
+    GUESS <guess>                  -> OK <black> <white> <pegs> <attempt> [WON | LOST <code>]
+    TOP [k]                        -> OK <n>, then "<username> <attempts>" rows
+    HISTORY [n]                    -> OK <n>, then "<date> <time> <username> <attempts>" rows
+    STATS                          -> OK games=.. wins=.. ...
+    HELP, QUIT
+
+Guesses are scored on the event loop (a GameSession call is microseconds). Storage
+runs on the loop's default thread pool and password hashing on the KDF pool, so
+neither stalls other players. Games in progress are kept per user, so a player
+who reconnects and logs in (or resumes) carries on where they left off.
+"""
+
+import argparse
+import asyncio
+from typing import Dict, List, Optional, Set
+
+import Group3_Mastermind_Project_Final as mastermind
+from Group3_Mastermind_Project_Final import GameSession
+from mastermind_credentials import needs_upgrade, submit_hash, submit_verify
+from mastermind_storage import USERNAME_RULE, valid_username
+from mastermind_usernames import get_username_suggester
+
+try:
+    import resource # POSIX only: lets the server raise its open-files limit
+except ImportError:
+    resource = None
+
+MAX_LINE = 1024
+MAX_LOGIN_FAILURES = 5
+IDLE_TIMEOUT = 30 * 60 # Seconds before a silent connection is closed
+MAX_ROWS = 100
+
+# Games in progress by username; a GameSession is a few hundred bytes.
+_games: Dict[str, GameSession] = {}
+_connections: Set["Connection"] = set()
+
+
+class ProtocolError(Exception):
+    """A bad request; the message goes back to the client after "ERR"."""
+
+
+def _in_thread(fn, *args):
+    """Runs blocking storage work on the loop's default thread pool."""
+    return asyncio.get_running_loop().run_in_executor(None, fn, *args)
+
+
+def _username(text: str) -> str:
+    username = text.strip().lower()
+    if not valid_username(username):
+        raise ProtocolError(f"Invalid username: use {USERNAME_RULE}.")
+    return username
+
+
+def _record_game(username: str, attempts: int, won: bool, classic: bool) -> None:
+    mastermind.save_game_result(username, attempts, won)
+    # Only classic wins go on the leaderboard, as in the console game
+    if won and classic:
+        mastermind.improve_highscore(username, attempts)
+
+
+class Connection:
+    """One client's state and command handlers."""
+
+    __slots__ = ("reader", "writer", "username", "token", "failures", "last_active")
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+        self.username: Optional[str] = None
+        self.token: Optional[str] = None
+        self.failures = 0
+        self.last_active = asyncio.get_running_loop().time()
+
+    def _require_login(self) -> str:
+        if self.username is None:
+            raise ProtocolError("Log in first.")
+        return self.username
+
+    async def _start_session(self, username: str) -> str:
+        self.username = username
+        self.token = await _in_thread(mastermind.sessions().issue, username)
+        return self.token
+
+    async def cmd_register(self, args: str) -> List[str]:
+        name, _, password = args.partition(" ")
+        username = _username(name)
+        if not password:
+            raise ProtocolError("Usage: REGISTER <username> <password>")
+        backend = mastermind.storage()
+        if await _in_thread(backend.user_exists, username):
+            raise ProtocolError("Username already taken.")
+        stored_pw = await asyncio.wrap_future(submit_hash(password))
+        # add_user refuses a name registered meanwhile, checking under the file lock
+        if not await _in_thread(backend.add_user, username, stored_pw):
+            raise ProtocolError("Username already taken.")
+        await _in_thread(get_username_suggester(backend).add, username)
+        return ["OK"]
+
+    async def cmd_login(self, args: str) -> List[str]:
+        name, _, password = args.partition(" ")
+        username = _username(name)
+        stored_pw = await _in_thread(mastermind.storage().get_password, username)
+        if stored_pw is None or not await asyncio.wrap_future(submit_verify(password, stored_pw)):
+            self.failures += 1
+            if self.failures >= MAX_LOGIN_FAILURES:
+                self.writer.write(b"ERR Too many failed logins.\n")
+                raise ConnectionResetError
+            raise ProtocolError("Wrong username or password.")
+        if needs_upgrade(stored_pw):
+            mastermind.upgrade_password_later(username, password, stored_pw)
+        return [f"OK {await self._start_session(username)}"]
+
+    async def cmd_resume(self, args: str) -> List[str]:
+        token = args.strip()
+        username = await _in_thread(mastermind.sessions().resume, token) if token else None
+        if username is None:
+            raise ProtocolError("Session expired or unknown. Log in again.")
+        self.username, self.token = username, token
+        return [f"OK {username}"]
+
+    async def cmd_logout(self, args: str) -> List[str]:
+        if self.token is not None:
+            await _in_thread(mastermind.sessions().revoke, self.token)
+        self.username = self.token = None
+        return ["OK"]
+
+    async def cmd_new(self, args: str) -> List[str]:
+        username = self._require_login()
+        variant = mastermind.VARIANTS.get(args.strip() or "1")
+        if variant is None:
+            raise ProtocolError(f"Unknown variant; choose from {', '.join(mastermind.VARIANTS)}.")
+        config = variant[1]
+        _games[username] = GameSession(config)
+        return [f"OK {''.join(config.colors)} {config.code_length} {config.max_attempts}"]
+
+    async def cmd_guess(self, args: str) -> List[str]:
+        username = self._require_login()
+        session = _games.get(username)
+        if session is None:
+            raise ProtocolError("No game in progress. Send NEW to start one.")
+        try:
+            result = session.submit_guess(args)
+        except ValueError as e:
+            raise ProtocolError(str(e))
+        reply = f"OK {result.black} {result.white} {''.join(result.positions)} {result.attempt}"
+        if result.over:
+            if _games.get(username) is session: # Unless a NEW from another connection replaced it
+                del _games[username]
+            await _in_thread(_record_game, username, result.attempt, result.won,
+                             session.config == mastermind.DEFAULT_CONFIG)
+            reply += " WON" if result.won else f" LOST {mastermind.decode_code(result.secret, session.config)}"
+        return [reply]
+
+    async def cmd_top(self, args: str) -> List[str]:
+        rows = await _in_thread(mastermind.top_highscores, _count(args, 5))
+        return [f"OK {len(rows)}"] + [f"{user} {score}" for user, score in rows]
+
+    async def cmd_history(self, args: str) -> List[str]:
+        rows = await _in_thread(mastermind.recent_games, _count(args, mastermind.HISTORY_PAGE_SIZE))
+        return [f"OK {len(rows)}"] + [f"{date} {user} {score}" for date, user, score in rows]
+
+    async def cmd_stats(self, args: str) -> List[str]:
+        stats = await _in_thread(mastermind.player_stats, self._require_login())
+        if stats is None:
+            return ["OK games=0"]
+        return ["OK " + " ".join(f"{field}={str(value).replace(' ', 'T')}"
+                                 for field, value in zip(stats._fields, stats))]
+
+    async def cmd_help(self, args: str) -> List[str]:
+        return ["OK REGISTER LOGIN RESUME LOGOUT NEW GUESS TOP HISTORY STATS HELP QUIT"]
+
+    async def handle(self, line: str) -> List[str]:
+        command, _, args = line.strip().partition(" ")
+        handler = getattr(self, "cmd_" + command.lower(), None)
+        if handler is None:
+            raise ProtocolError(f"Unknown command '{command}'. Send HELP for the list.")
+        return await handler(args.strip())
+
+
+def _count(args: str, default: int) -> int:
+    try:
+        return max(1, min(MAX_ROWS, int(args))) if args else default
+    except ValueError:
+        raise ProtocolError("Expected a number.")
+
+
+async def serve_client(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    conn = Connection(reader, writer)
+    _connections.add(conn)
+    loop = asyncio.get_running_loop()
+    writer.write(b"OK MASTERMIND - send HELP for the commands\n")
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            conn.last_active = loop.time()
+            text = line.decode("utf-8", "replace").strip()
+            if not text:
+                continue
+            if text.upper() == "QUIT":
+                writer.write(b"OK BYE\n")
+                break
+            try:
+                replies = await conn.handle(text)
+            except ProtocolError as e:
+                replies = [f"ERR {e}"]
+            except IOError as e:
+                replies = [f"ERR Storage error: {e}"]
+            writer.write(("\n".join(replies) + "\n").encode("utf-8"))
+            await writer.drain()
+    except (asyncio.LimitOverrunError, ValueError, ConnectionError):
+        pass # An overlong line, or the client went away
+    finally:
+        _connections.discard(conn)
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except ConnectionError:
+            pass
+
+
+def raise_open_files_limit() -> int:
+    """Lifts the soft open-files limit to the hard one, for many connections; returns it."""
+    if resource is None:
+        return -1
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if hard == resource.RLIM_INFINITY or soft < hard:
+        target = 1 << 20 if hard == resource.RLIM_INFINITY else hard
+        try:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (target, hard))
+            soft = target
+        except (ValueError, OSError):
+            pass
+    return soft
+
+
+async def close_idle_connections(interval: float = 60.0) -> None:
+    """Closes connections silent for IDLE_TIMEOUT; one sweep a minute is cheaper than a timer per read."""
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(interval)
+        cutoff = loop.time() - IDLE_TIMEOUT
+        for conn in [conn for conn in _connections if conn.last_active < cutoff]:
+            conn.writer.close() # Its pending readline() then ends the handler
+
+
+async def run_server(host: str, port: int) -> None:
+    server = await asyncio.start_server(serve_client, host, port, limit=MAX_LINE, backlog=4096)
+    sweeper = asyncio.create_task(close_idle_connections())
+    print(f"Mastermind server listening on {', '.join(str(s.getsockname()) for s in server.sockets)}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        sweeper.cancel()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve Mastermind over TCP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=4040)
+    parser.add_argument("--storage", default=mastermind.STORAGE_BACKEND,
+                        help='"text", "binary[:<path>]" or "sqlite:<path>" (default: $MASTERMIND_STORAGE or text)')
+    args = parser.parse_args()
+
+    mastermind.STORAGE_BACKEND = args.storage
+    print(f"Open files limit: {raise_open_files_limit()}")
+    try:
+        asyncio.run(run_server(args.host, args.port))
+    except KeyboardInterrupt:
+        print("\nShutting down.")
+    finally:
+        mastermind.close_result_writer() # Save any queued results before the process ends
@@ -0,0 +1,170 @@
+"""Login sessions, so a logged-in player can play again without re-entering a password.
+
+login issues a random token for the user. resume(token) gives the username back
+in O(1) until the token expires (TTL seconds after login), is revoked, or is
+evicted as the least recently used once max_sessions are live. Only a hash of
+each token is kept.
+
+With a path the sessions are also journaled to a file ("<token hash>,<username>,
+<expiry>" lines, an AppendOnlyIndex), so other processes - logout.py, another
+game window - see them and see revocations. Revocations are written as records
+with no username; compaction drops them along with expired and evicted sessions.
+"""
+
+import base64
+import hashlib
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from mastermind_storage import AppendOnlyIndex
+
+SESSION_TTL = 30 * 60 # Seconds a login stays valid
+MAX_SESSIONS = 10000
+SESSIONS_FILE = "sessions.txt"
+CURRENT_SESSION_FILE = "session.txt" # This machine's token; logout.py blanks it
+
+
+def _key(token: str) -> str:
+    digest = hashlib.blake2b(token.encode("utf-8"), digest_size=16).digest()
+    return base64.urlsafe_b64encode(digest).decode("ascii").rstrip("=")
+
+
+class _SessionJournal(AppendOnlyIndex):
+    """The session file; replaying it applies every record to the store's LRU."""
+
+    def __init__(self, path: str, store: "SessionStore"):
+        super().__init__(path)
+        self._store = store
+
+    def _clear(self) -> None:
+        self._store._sessions.clear()
+
+    def _load_record(self, key: str, value: str) -> bool:
+        username, _, expires = value.rpartition(",")
+        try:
+            self._store._apply(key, username, float(expires))
+        except ValueError:
+            return False
+        return True
+
+    def _live_records(self) -> List[str]:
+        now = time.time()
+        return [f"{key},{username},{expires:.0f}"
+                for key, (username, expires) in self._store._sessions.items() if expires > now]
+
+    def __len__(self) -> int:
+        return len(self._store._sessions)
+
+
+class SessionStore:
+    """token -> username with a fixed lifetime per token and LRU eviction."""
+
+    def __init__(self, ttl: float = SESSION_TTL, max_sessions: int = MAX_SESSIONS,
+                 path: Optional[str] = None):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, Tuple[str, float]]" = OrderedDict() # key -> (username, expires)
+        self._journal = _SessionJournal(path, self) if path else None
+        self._lock = self._journal._lock if self._journal else threading.RLock()
+
+    def _apply(self, key: str, username: str, expires: float) -> None:
+        if not username:
+            self._sessions.pop(key, None) # Revoked
+            return
+        self._sessions[key] = (username, expires)
+        self._sessions.move_to_end(key)
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+
+    def _refresh(self) -> None:
+        if self._journal is not None:
+            self._journal._refresh_if_present()
+
+    def _change(self, change):
+        """Runs change() -> (records, result) under the lock, journaling the records if persisted."""
+        if self._journal is not None:
+            return self._journal._commit(change)
+        with self._lock:
+            return change()[1]
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._refresh()
+            return len(self._sessions)
+
+    def issue(self, username: str) -> str:
+        """Starts a session for username and returns its token."""
+        token = secrets.token_urlsafe(24)
+        key, expires = _key(token), time.time() + self.ttl
+
+        def change():
+            self._apply(key, username, expires)
+            return f"{key},{username},{expires:.0f}", None
+        self._change(change)
+        return token
+
+    def resume(self, token: str) -> Optional[str]:
+        """Returns the session's username, or None if it is unknown, expired or revoked."""
+        key = _key(token)
+        with self._lock:
+            self._refresh()
+            session = self._sessions.get(key)
+            if session is None:
+                return None
+            if session[1] <= time.time():
+                del self._sessions[key]
+                return None
+            self._sessions.move_to_end(key)
+            return session[0]
+
+    def revoke(self, token: str) -> bool:
+        """Ends a session; returns False if it was not live."""
+        key = _key(token)
+
+        def change():
+            if self._sessions.pop(key, None) is None:
+                return None, False
+            return f"{key},,0", True
+        return self._change(change)
+
+    def revoke_user(self, username: str) -> int:
+        """Ends every session of a user, e.g. after a password reset; returns how many."""
+        def change():
+            keys = [key for key, (user, _) in self._sessions.items() if user == username]
+            for key in keys:
+                del self._sessions[key]
+            return [f"{key},,0" for key in keys], len(keys)
+        return self._change(change)
+
+
+_stores: Dict[Optional[str], SessionStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_session_store(path: Optional[str] = None) -> SessionStore:
+    """Returns the shared store for a session file (None: in memory only)."""
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            store = _stores[path] = SessionStore(path=path)
+        return store
+
+
+def read_current_token(path: str = CURRENT_SESSION_FILE) -> Optional[str]:
+    """The token saved by the last login on this machine, if any."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def write_current_token(token: str, path: str = CURRENT_SESSION_FILE) -> None:
+    """Saves (or with "" clears) this machine's token; only the owner can read it."""
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(token)
@@ -0,0 +1,121 @@
+"""Headless Monte Carlo simulator: plays many automated games without the console.
+
+Example:
+    python mastermind_simulator.py --strategy minimax --games 1000000 --workers 8
+"""
+
+import argparse
+import os
+import random
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional, Tuple
+
+import Group3_Mastermind_Project_Final as mastermind
+from Group3_Mastermind_Project_Final import GameConfig
+from mastermind_solver import STRATEGIES, RandomSolver
+
+
+def play_headless(strategy: str, secret: int, config: GameConfig = mastermind.DEFAULT_CONFIG,
+                  rng: Optional[random.Random] = None) -> Tuple[int, bool]:
+    """Plays one game with a solver strategy; returns (attempts_used, won) like play_game."""
+    if strategy == "random":
+        solver = RandomSolver(config, rng)
+    else:
+        solver = STRATEGIES[strategy](config)
+
+    for attempt in range(1, config.max_attempts + 1):
+        guess = solver.next_guess()
+        black, white = mastermind.score_guess(secret, guess, config)
+        if black == config.code_length:
+            return attempt, True
+        solver.update(guess, black, white)
+    return config.max_attempts, False
+
+
+def _simulate_batch(strategy: str, games: int, config: GameConfig, seed: int) -> Tuple[Dict[int, int], int]:
+    """Runs one worker task; returns (attempt counts of won games, games lost)."""
+    rng = random.Random(seed)
+    mastermind.load_feedback_table(config)
+    wins: Counter = Counter()
+    losses = 0
+    for _ in range(games):
+        attempts, won = play_headless(strategy, mastermind.generate_secret_code(config, rng), config, rng)
+        if won:
+            wins[attempts] += 1
+        else:
+            losses += 1
+    return dict(wins), losses
+
+
+def run_simulation(strategy: str, games: int, config: GameConfig = mastermind.DEFAULT_CONFIG,
+                   workers: Optional[int] = None, seed: int = 0, batch_size: int = 10000) -> Dict:
+    """Plays `games` games across a process pool and returns a summary dict.
+
+    Every batch gets its own seed (seed + batch number), so a run is reproducible
+    whatever the worker count.
+    """
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown strategy '{strategy}'; choose from {sorted(STRATEGIES)}.")
+    if config.n_codes > mastermind.MAX_TABLE_CODES:
+        raise ValueError(f"The simulator needs a feedback table; {config.label} is too large.")
+    mastermind.load_feedback_table(config) # Build it once before the workers map it
+
+    workers = workers or os.cpu_count() or 1
+    sizes = [min(batch_size, games - start) for start in range(0, games, batch_size)]
+    wins: Counter = Counter()
+    losses = 0
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = pool.map(_simulate_batch, [strategy] * len(sizes), sizes,
+                           [config] * len(sizes), [seed + i for i in range(len(sizes))])
+        for batch_wins, batch_losses in results:
+            wins.update(batch_wins)
+            losses += batch_losses
+    elapsed = time.perf_counter() - start
+
+    won = sum(wins.values())
+    return {
+        "strategy": strategy,
+        "board": config.label,
+        "max_attempts": config.max_attempts,
+        "games": games,
+        "wins": won,
+        "losses": losses,
+        "win_rate": won / games if games else 0.0,
+        "average_attempts": sum(k * v for k, v in wins.items()) / won if won else 0.0,
+        "attempt_distribution": dict(sorted(wins.items())),
+        "seconds": elapsed,
+        "games_per_second": games / elapsed if elapsed else 0.0,
+    }
+
+
+def print_report(summary: Dict) -> None:
+    print(f"\n=== Simulation: {summary['strategy']} on {summary['board']} ===")
+    print(f"Games: {summary['games']}  Wall time: {summary['seconds']:.2f}s  "
+          f"({summary['games_per_second']:,.0f} games/s)")
+    print(f"Win rate within {summary['max_attempts']} attempts: {summary['win_rate']:.2%}  "
+          f"Average attempts (wins): {summary['average_attempts']:.3f}")
+    print(f"{'Attempts':<8} | {'Games':>10} | {'Share':>7}")
+    for attempts, count in summary["attempt_distribution"].items():
+        print(f"{attempts:<8} | {count:>10} | {count / summary['games']:>7.2%}")
+    if summary["losses"]:
+        print(f"{'Lost':<8} | {summary['losses']:>10} | {summary['losses'] / summary['games']:>7.2%}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Play automated Mastermind games headlessly.")
+    parser.add_argument("--strategy", choices=sorted(STRATEGIES), default="minimax")
+    parser.add_argument("--games", type=int, default=100000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--variant", choices=sorted(mastermind.VARIANTS), default="1",
+                        help="board from the game's variant menu (default: 1, Classic)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    try:
+        print_report(run_simulation(args.strategy, args.games, mastermind.VARIANTS[args.variant][1],
+                                    args.workers, args.seed))
+    except ValueError as e:
+        parser.error(str(e))
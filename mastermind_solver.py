@@ -0,0 +1,141 @@
+"""Mastermind solvers for boards small enough for the feedback table (used by HINT)."""
+
+import random
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+import Group3_Mastermind_Project_Final as mastermind
+
+
+# Best next guess for every candidate set seen so far, keyed by the solver, the
+# board and the candidate array's bytes. Any two histories that leave the same
+# codes possible share an entry, so repeated hints cost one dict lookup.
+_next_guess_cache: Dict[Tuple[str, mastermind.GameConfig, bytes], int] = {}
+
+
+class Solver(ABC):
+    """Tracks the codes still consistent with the feedback; subclasses pick the guesses."""
+
+    def __init__(self, config: mastermind.GameConfig = mastermind.DEFAULT_CONFIG):
+        self.config = config
+        # table[secret, guess] -> encoded (black, white) byte
+        self.table = mastermind.load_feedback_table(config)[0]
+        self.n_codes = config.n_codes
+        self.n_feedback = (config.code_length + 1) ** 2
+        self.candidates = np.arange(self.n_codes, dtype=np.int32)
+
+    def update(self, guess: int, black: int, white: int) -> None:
+        """Drops every candidate that would not have produced this feedback."""
+        feedback = mastermind.encode_feedback(black, white, self.config)
+        self.candidates = self.candidates[self.table[self.candidates, guess] == feedback]
+
+    def next_guess(self) -> int:
+        """Returns the best guess by this solver's rule, cached per candidate set."""
+        if len(self.candidates) == 0:
+            raise ValueError("No code is consistent with the feedback given.")
+        if len(self.candidates) <= 2:
+            return int(self.candidates[0])
+
+        key = (type(self).__name__, self.config, self.candidates.tobytes())
+        guess = _next_guess_cache.get(key)
+        if guess is None:
+            guess = self._choose_guess()
+            _next_guess_cache[key] = guess
+        return guess
+
+    @abstractmethod
+    def _choose_guess(self) -> int:
+        """Picks the next guess for the current candidates (at least three of them)."""
+
+    def _partitions(self) -> np.ndarray:
+        """Row g counts how many candidates land in each feedback class when g is played."""
+        feedback = self.table[self.candidates].T.astype(np.int32)
+        feedback += (np.arange(self.n_codes, dtype=np.int32) * self.n_feedback)[:, None]
+        partitions = np.bincount(feedback.ravel(), minlength=self.n_codes * self.n_feedback)
+        return partitions.reshape(self.n_codes, self.n_feedback)
+
+    def _lowest_score(self, scores: np.ndarray) -> int:
+        """Picks the lowest score; ties prefer a possible secret, then the lowest code."""
+        tied = np.flatnonzero(np.isclose(scores, scores.min()))
+        preferred = tied[np.isin(tied, self.candidates)]
+        return int(preferred[0] if len(preferred) else tied[0])
+
+
+class KnuthSolver(Solver):
+    """Picks the guess whose worst-case partition of the candidates is smallest.
+
+    With Knuth's tie-break this opens with RRGG on the default board and never needs
+    more than 5 guesses.
+    """
+
+    def _choose_guess(self) -> int:
+        return self._lowest_score(self._partitions().max(axis=1).astype(np.float64))
+
+
+class EntropySolver(Solver):
+    """Picks the guess whose feedback tells the most about the secret (maximum entropy)."""
+
+    def _choose_guess(self) -> int:
+        # Entropy is log(k) - sum(n log n) / k, so the best guess minimizes sum(n log n).
+        partitions = self._partitions().astype(np.float64)
+        scores = (partitions * np.log(np.where(partitions > 0, partitions, 1))).sum(axis=1)
+        return self._lowest_score(scores)
+
+
+class RandomSolver(Solver):
+    """Plays a random code that is still consistent with the feedback."""
+
+    def __init__(self, config: mastermind.GameConfig = mastermind.DEFAULT_CONFIG,
+                 rng: Optional[random.Random] = None):
+        super().__init__(config)
+        self.rng = rng or random.Random()
+
+    def next_guess(self) -> int:
+        if len(self.candidates) == 0:
+            raise ValueError("No code is consistent with the feedback given.")
+        return self._choose_guess() # Not cached: each call should draw again
+
+    def _choose_guess(self) -> int:
+        return int(self.candidates[self.rng.randrange(len(self.candidates))])
+
+
+STRATEGIES = {
+    "random": RandomSolver,
+    "minimax": KnuthSolver,
+    "entropy": EntropySolver,
+}
+
+
+def suggest_guess(history: List[Tuple[int, int, int]],
+                  config: mastermind.GameConfig = mastermind.DEFAULT_CONFIG) -> int:
+    """Returns the solver's next guess after a list of (guess, black, white) turns."""
+    solver = KnuthSolver(config)
+    for guess, black, white in history:
+        solver.update(guess, black, white)
+    return solver.next_guess()
+
+
+def solve(secret: int, config: mastermind.GameConfig = mastermind.DEFAULT_CONFIG) -> List[int]:
+    """Plays the solver against a known secret and returns the guesses it made."""
+    solver = KnuthSolver(config)
+    guesses = []
+    while True:
+        guess = solver.next_guess()
+        guesses.append(guess)
+        black, white = mastermind.score_guess(secret, guess, config)
+        if black == config.code_length:
+            return guesses
+        solver.update(guess, black, white)
+
+
+if __name__ == "__main__":
+    counts: Dict[int, int] = {}
+    for secret in range(mastermind.DEFAULT_CONFIG.n_codes):
+        n = len(solve(secret))
+        counts[n] = counts.get(n, 0) + 1
+    total = sum(counts.values())
+    print(f"Solved {total} secrets, average {sum(k * v for k, v in counts.items()) / total:.3f} guesses")
+    for n in sorted(counts):
+        print(f"{n} guesses: {counts[n]}")
@@ -0,0 +1,1744 @@
+"""Storage for Mastermind players, highscores and game history (text files or SQLite)."""
+
+import argparse
+import bisect
+import itertools
+import mmap
+import os
+import re
+import sqlite3
+import struct
+import sys
+import threading
+import time
+from abc import ABC, abstractmethod
+from array import array
+from collections.abc import Sequence
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+try:
+    import fcntl # POSIX only; elsewhere just the threads of one process are serialized
+except ImportError:
+    fcntl = None
+
+try:
+    import numpy as np # Optional: decodes the binary game history in bulk
+except ImportError:
+    np = None
+
+
+def _line_start(f) -> bytes:
+    """Returns the newline to write first if the file (opened "a+b") lacks a trailing one."""
+    if f.seek(0, os.SEEK_END) == 0:
+        return b""
+    f.seek(-1, os.SEEK_END)
+    return b"" if f.read(1) == b"\n" else b"\n"
+
+
+def iter_lines_reverse(path: str, block_size: int = 1 << 16) -> Iterator[str]:
+    """Yields a text file's non-empty lines last-to-first, reading block_size bytes at a time."""
+    with open(path, "rb") as f:
+        pos = f.seek(0, os.SEEK_END)
+        partial = b""
+        while pos > 0:
+            size = min(block_size, pos)
+            pos -= size
+            f.seek(pos)
+            lines = (f.read(size) + partial).split(b"\n")
+            partial = lines[0] # May continue in the previous block
+            for line in reversed(lines[1:]):
+                if line.strip():
+                    yield line.decode("utf-8")
+        if partial.strip():
+            yield partial.decode("utf-8")
+
+
+def _parse_game(line: str) -> Optional[Tuple[str, str, int, Optional[bool]]]:
+    """Parses "date,username,score[,won]"; won is None for lines written without it."""
+    parts = line.strip().split(",")
+    if len(parts) == 3:
+        won = None
+    elif len(parts) == 4 and parts[3] in ("0", "1"):
+        won = parts[3] == "1"
+    else:
+        return None
+    try:
+        return parts[0], parts[1], int(parts[2]), won
+    except ValueError:
+        return None
+
+
+# --- Locking and Group Commit ---
+
+@contextmanager
+def file_lock(path: str) -> Iterator[None]:
+    """Holds an exclusive advisory lock (fcntl.flock) on "<path>.lock" while the block runs.
+
+    The lock lives in a side file because the data files themselves get replaced by
+    rename, which would leave other processes holding a lock on the old inode.
+    """
+    if fcntl is None:
+        yield
+        return
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path + ".lock", "a+b") as f:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+class GroupCommit:
+    """Batches writes that arrive while another batch is being written.
+
+    The first thread to submit while nothing is being written becomes the leader:
+    it takes everything queued so far and hands it to write_batch, which writes it
+    with one locked write and one fsync. Threads that submit meanwhile wait and are
+    committed together by the next leader. write_batch returns one result per item;
+    an exception instance in that list is raised in the submitting thread.
+    """
+
+    _PENDING = object()
+
+    def __init__(self, write_batch: Callable[[List[Any]], List[Any]]):
+        self._write_batch = write_batch
+        self._cond = threading.Condition()
+        self._queue: List[list] = []
+        self._writing = False
+
+    def submit(self, item: Any) -> Any:
+        return self.submit_many([item])[0]
+
+    def submit_many(self, items: List[Any]) -> List[Any]:
+        """Commits several items in order, in the same batch; raises the first failure."""
+        slots = [[item, self._PENDING] for item in items]
+        if not slots:
+            return []
+        with self._cond:
+            self._queue.extend(slots)
+            while self._writing and slots[-1][1] is self._PENDING:
+                self._cond.wait()
+            leader = slots[-1][1] is self._PENDING
+            if leader:
+                self._writing = True
+                batch, self._queue = self._queue, []
+        if leader:
+            try:
+                try:
+                    results = self._write_batch([queued[0] for queued in batch])
+                except BaseException as e:
+                    results = [e] * len(batch)
+                for queued, result in zip(batch, results):
+                    queued[1] = result
+            finally:
+                with self._cond:
+                    self._writing = False
+                    self._cond.notify_all()
+        for slot in slots:
+            if isinstance(slot[1], BaseException):
+                raise slot[1]
+        return [slot[1] for slot in slots]
+
+
+def _append_fsynced(path: str, lines: List[str]) -> None:
+    """Appends lines in one write and fsyncs; the caller holds file_lock(path)."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "a+b") as f:
+        f.write(_line_start(f) + "".join(line + "\n" for line in lines).encode("utf-8"))
+        f.flush()
+        os.fsync(f.fileno())
+
+
+class AppendLog:
+    """A text file that is only ever appended to, with locked, group-committed writes."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._group = GroupCommit(self._write_batch)
+
+    def append(self, line: str) -> None:
+        """Returns once the line is on disk."""
+        self._group.submit(line)
+
+    def extend(self, lines: List[str]) -> None:
+        self._group.submit_many(lines)
+
+    def _write_batch(self, lines: List[str]) -> List[None]:
+        with file_lock(self.path):
+            _append_fsynced(self.path, lines)
+        return [None] * len(lines)
+
+
+# --- Append-Only Indexed Files ---
+
+class AppendOnlyIndex(ABC):
+    """A "key,value" text file loaded once into a dict and kept fresh cheaply.
+
+    Before each read the file's (inode, size, mtime) is checked: if another process
+    appended to it, only the new tail is read; if it was replaced or otherwise
+    changed, the whole file is reloaded. Rewrites always go through a temp file and
+    rename, so an unchanged inode means the file was only appended to.
+
+    Changes are appended as new records and the last record for a key wins. Once
+    more than COMPACT_DEAD_RATIO of the records are superseded, a background thread
+    rewrites the file with one record per key.
+
+    Every write holds file_lock(path), so processes sharing the file never interleave
+    or lose each other's records. Changes made by concurrent threads are group
+    committed: one locked append and one fsync for the whole batch.
+    """
+
+    COMPACT_DEAD_RATIO = 0.5
+    COMPACT_MIN_RECORDS = 1024
+
+    def __init__(self, path: str):
+        self.path = path
+        self._records = 0 # Complete records in the file, superseded ones included
+        self._stamp: Optional[Tuple[int, int, int]] = None # (inode, size, mtime_ns)
+        self._lock = threading.RLock()
+        self._compactor: Optional[threading.Thread] = None
+        self._group = GroupCommit(self._write_batch)
+
+    # Subclass hooks
+    @abstractmethod
+    def _clear(self) -> None: ...
+
+    @abstractmethod
+    def _load_record(self, key: str, value: str) -> bool:
+        """Applies one parsed record; returns False if it was malformed."""
+
+    @abstractmethod
+    def _live_records(self) -> List[str]:
+        """The "key,value" lines a compacted file should contain."""
+
+    @abstractmethod
+    def __len__(self) -> int: ...
+
+    def _loaded(self) -> None:
+        """Runs after _clear() and a load of the whole file, for indexes built in one go."""
+
+    def _refresh(self) -> None:
+        """Brings the index up to date with the file; raises FileNotFoundError if it is gone."""
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            self._clear()
+            self._loaded()
+            self._records = 0
+            self._stamp = None
+            raise
+        stamp = (st.st_ino, st.st_size, st.st_mtime_ns)
+        if stamp == self._stamp:
+            return
+
+        offset = 0
+        full = not (self._stamp is not None and stamp[0] == self._stamp[0] and stamp[1] > self._stamp[1])
+        if not full:
+            offset = self._stamp[1] # Same file, only appended to: read just the tail
+        else:
+            self._clear()
+            self._records = 0
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            data = f.read(st.st_size - offset)
+        # Resume after the last complete line, so a line that was still being
+        # written (or has no trailing newline) is read again next time.
+        complete = data.rfind(b"\n") + 1
+        self._records += self._load_lines(data[:complete].decode("utf-8"))
+        self._load_lines(data[complete:].decode("utf-8"))
+        if full:
+            self._loaded()
+        self._stamp = (st.st_ino, offset + complete, st.st_mtime_ns)
+
+    def _refresh_if_present(self) -> None:
+        try:
+            self._refresh()
+        except FileNotFoundError:
+            pass
+
+    def _load_lines(self, text: str) -> int:
+        """Applies "key,value" lines; returns how many were valid."""
+        loaded = 0
+        # Split on "\n" only, as every writer and reader does: str.splitlines() also
+        # breaks on "\r", "\x1c" and the like, which could start a record inside a field.
+        for line in text.split("\n"):
+            line = line.rstrip("\r").strip(" \t")
+            if not line:
+                continue
+            try:
+                key, value = line.split(",", 1)
+            except ValueError:
+                continue
+            loaded += self._load_record(key, value)
+        return loaded
+
+    def _commit(self, change: Callable[[], Tuple[Optional[str], Any]]) -> Any:
+        """Applies a change and persists it; returns the change's result.
+
+        change() runs with the file locked and the index fresh, updates the index
+        and returns (record to append, a list of them, or None; result). Don't call this while
+        holding self._lock: the batch leader may be another thread that needs it.
+        """
+        return self._group.submit(change)
+
+    def _commit_many(self, changes: List[Callable[[], Tuple[Optional[str], Any]]]) -> List[Any]:
+        return self._group.submit_many(changes)
+
+    def _write_batch(self, changes: List[Callable[[], Tuple[Optional[str], Any]]]) -> List[Any]:
+        results: List[Any] = []
+        lines: List[str] = []
+        with self._lock, file_lock(self.path):
+            self._refresh_if_present()
+            for change in changes:
+                try:
+                    line, result = change()
+                except Exception as e:
+                    results.append(e)
+                    continue
+                if isinstance(line, list):
+                    lines.extend(line)
+                elif line is not None:
+                    lines.append(line)
+                results.append(result)
+            if lines:
+                try:
+                    _append_fsynced(self.path, lines)
+                except OSError:
+                    self._stamp = None # The index is ahead of the file: reload it next time
+                    raise
+            # The next read picks up the appended tail (these records plus anything
+            # other processes appended before), so the index can't miss a write.
+            dead = self._records + len(lines) - len(self)
+            if dead > self.COMPACT_DEAD_RATIO * max(self._records, self.COMPACT_MIN_RECORDS):
+                self.compact_in_background()
+        return results
+
+    def dead_ratio(self) -> float:
+        """Share of the file's records that a newer record has superseded."""
+        with self._lock:
+            self._refresh_if_present()
+            return 1 - len(self) / self._records if self._records else 0.0
+
+    def _write_file(self, lines: List[str]) -> None:
+        """Atomically replaces the file with the given records."""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.writelines(line + "\n" for line in lines)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        st = os.stat(self.path)
+        self._records = len(lines)
+        self._stamp = (st.st_ino, st.st_size, st.st_mtime_ns)
+
+    def compact(self) -> None:
+        """Rewrites the file with only the newest record per key, atomically."""
+        with self._lock, file_lock(self.path):
+            self._refresh()
+            self._write_file(self._live_records())
+
+    def compact_in_background(self) -> None:
+        """Starts compact() on a daemon thread unless one is already running."""
+        if self._compactor is not None and self._compactor.is_alive():
+            return
+        self._compactor = threading.Thread(target=self._compact_quietly, daemon=True)
+        self._compactor.start()
+
+    def _compact_quietly(self) -> None:
+        try:
+            self.compact()
+        except IOError as e:
+            print(f"Error compacting {self.path}: {e}")
+
+
+# --- Players Repository ---
+
+USERNAME_RULE = "1-32 lowercase letters, digits or underscores"
+_USERNAME = re.compile(r"[a-z0-9_]{1,32}")
+
+
+def valid_username(username: str) -> bool:
+    return _USERNAME.fullmatch(username) is not None
+
+
+def check_player(username: str, stored_pw: str) -> None:
+    """Raises ValueError unless the pair is safe to write as one "username,password" record."""
+    if not valid_username(username):
+        raise ValueError(f"Invalid username {username!r}: use {USERNAME_RULE}")
+    if not stored_pw or not stored_pw.isprintable():
+        raise ValueError(f"Invalid stored password for {username}")
+
+
+class PlayersRepository(AppendOnlyIndex):
+    """players.txt as a {username: stored_password} index.
+
+    Registration appends a new user; a password change is appended as a journal
+    record that supersedes the user's older ones.
+    """
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        self._index: Dict[str, str] = {}
+
+    def _clear(self) -> None:
+        self._index.clear()
+
+    def _load_record(self, key: str, value: str) -> bool:
+        self._index[key] = value
+        return True
+
+    def _live_records(self) -> List[str]:
+        return [f"{user},{pw}" for user, pw in self._index.items()]
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def exists(self, username: str) -> bool:
+        with self._lock:
+            self._refresh()
+            return username in self._index
+
+    def get_password(self, username: str) -> Optional[str]:
+        """Returns the stored (encrypted) password, or None for an unknown user."""
+        with self._lock:
+            self._refresh()
+            return self._index.get(username)
+
+    def add(self, username: str, stored_pw: str) -> bool:
+        """Appends a new user to the file and the index together; returns False if the name is taken."""
+        check_player(username, stored_pw)
+
+        def change():
+            if username in self._index:
+                return None, False
+            self._index[username] = stored_pw
+            return f"{username},{stored_pw}", True
+        return self._commit(change)
+
+    def add_many(self, users: List[Tuple[str, str]]) -> int:
+        """Appends every user not registered yet in one write; returns how many were added."""
+        for username, stored_pw in users:
+            check_player(username, stored_pw)
+
+        def change():
+            lines = []
+            for username, stored_pw in users:
+                if username not in self._index:
+                    self._index[username] = stored_pw
+                    lines.append(f"{username},{stored_pw}")
+            return lines, len(lines)
+        return self._commit(change)
+
+    def set_password(self, username: str, stored_pw: str) -> bool:
+        """Appends a password-change record; returns False for an unknown user."""
+        check_player(username, stored_pw)
+
+        def change():
+            if username not in self._index:
+                return None, False
+            self._index[username] = stored_pw
+            return f"{username},{stored_pw}", True
+        return self._commit(change)
+
+    def usernames(self) -> Iterator[str]:
+        with self._lock:
+            self._refresh_if_present() # No players file yet: no users
+            return iter(list(self._index))
+
+    def users(self) -> Iterator[Tuple[str, str]]:
+        """(username, stored password) pairs in registration order, as of this call."""
+        with self._lock:
+            self._refresh_if_present()
+            return iter(list(self._index.items()))
+
+    def compact(self) -> None:
+        super().compact()
+        if os.path.exists(UserDirectory.path_for(self.path)):
+            UserDirectory.build(self.path) # Compaction replaced the file the directory was built from
+
+
+# --- Compiled User Directory ---
+
+class UserDirectory:
+    """players.txt compiled into sorted fixed-width records and searched in place.
+
+    The compiled file ("<players file>.idx") is a header followed by one record per
+    user, sorted by username: the name and the stored password, each NUL-padded to
+    the longest one. It is memory-mapped, so a lookup is a binary search touching a
+    few pages, a new process has nothing to parse, and all processes share the page
+    cache. Users appended to players.txt after the build are read from its tail.
+    Once players.txt has been rewritten (compaction), the directory is stale until
+    build() runs again; PlayersRepository.compact does that itself.
+    """
+
+    MAGIC = b"MMUD\x01\x00\x00\x00"
+    # magic, players.txt inode and bytes compiled, user count, name width, password width
+    HEADER = struct.Struct("<8sQQQII")
+    RECHECK_SECONDS = 1.0 # How long "no directory built" is trusted before looking again
+
+    def __init__(self, players_path: str):
+        self.players_path = players_path
+        self.path = self.path_for(players_path)
+        self._lock = threading.RLock()
+        self._mm: Optional[mmap.mmap] = None
+        self._stamp: Optional[Tuple[int, int]] = None # (inode, mtime_ns) of the mapped file
+        self._header: Tuple = ()
+        self._players_size = 0 # Size of players.txt at the last check
+        self._tail: Optional[PlayersRepository] = None
+        self._missing_until = 0.0
+
+    @staticmethod
+    def path_for(players_path: str) -> str:
+        return players_path + ".idx"
+
+    @classmethod
+    def build(cls, players_path: str) -> int:
+        """Compiles players_path into its .idx file atomically; returns the number of users."""
+        with file_lock(players_path):
+            st = os.stat(players_path)
+            with open(players_path, "rb") as f:
+                data = f.read(st.st_size)
+        complete = data.rfind(b"\n") + 1
+        users: Dict[bytes, bytes] = {}
+        for line in data[:complete].split(b"\n"):
+            name, sep, stored_pw = line.strip().partition(b",")
+            if sep:
+                users[name] = stored_pw # The last record for a user wins, as in the text file
+        names = sorted(users)
+        name_width = max(map(len, names), default=0)
+        pw_width = max(map(len, users.values()), default=0)
+
+        path = cls.path_for(players_path)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as out:
+            out.write(cls.HEADER.pack(cls.MAGIC, st.st_ino, complete, len(names), name_width, pw_width))
+            out.write(b"".join(name.ljust(name_width, b"\0") + users[name].ljust(pw_width, b"\0")
+                               for name in names))
+            out.flush()
+            os.fsync(out.fileno())
+        os.replace(tmp_path, path)
+        return len(names)
+
+    def _close(self) -> None:
+        if self._mm is not None:
+            self._mm.close()
+        self._mm, self._stamp, self._tail = None, None, None
+
+    def is_current(self) -> bool:
+        """Maps the latest build; False if there is none or players.txt was rewritten since."""
+        with self._lock:
+            if self._mm is None and time.monotonic() < self._missing_until:
+                return False
+            try:
+                st = os.stat(self.path)
+                players_st = os.stat(self.players_path)
+            except FileNotFoundError:
+                self._close()
+                self._missing_until = time.monotonic() + self.RECHECK_SECONDS
+                return False
+            if (st.st_ino, st.st_mtime_ns) != self._stamp:
+                self._close()
+                with open(self.path, "rb") as f:
+                    mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                header = self.HEADER.unpack_from(mm)
+                if header[0] != self.MAGIC:
+                    mm.close()
+                    raise StorageError(f"{self.path} is not a compiled user directory")
+                self._mm, self._stamp, self._header = mm, (st.st_ino, st.st_mtime_ns), header
+            _, inode, compiled, _, _, _ = self._header
+            self._players_size = players_st.st_size
+            return players_st.st_ino == inode and players_st.st_size >= compiled
+
+    def _search(self, username: str) -> Optional[str]:
+        _, _, _, count, name_width, pw_width = self._header
+        name = username.encode("utf-8")
+        if len(name) > name_width:
+            return None
+        key = name.ljust(name_width, b"\0")
+        mm, size, base = self._mm, name_width + pw_width, self.HEADER.size
+        lo, hi = 0, count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if mm[base + mid * size:base + mid * size + name_width] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        start = base + lo * size
+        if lo < count and mm[start:start + name_width] == key:
+            return mm[start + name_width:start + size].rstrip(b"\0").decode("utf-8")
+        return None
+
+    def get_password(self, username: str) -> Optional[str]:
+        """Returns the stored password, or None for an unknown user. Call is_current() first."""
+        with self._lock:
+            _, inode, compiled, _, _, _ = self._header
+            if self._tail is None and self._players_size > compiled:
+                # Index only what was appended after the build
+                self._tail = PlayersRepository(self.players_path)
+                self._tail._stamp = (inode, compiled, 0)
+            if self._tail is not None:
+                stored_pw = self._tail.get_password(username)
+                if stored_pw is not None:
+                    return stored_pw # Newer than the compiled record, if there is one
+            return self._search(username)
+
+
+# --- Leaderboard ---
+
+class Leaderboard(AppendOnlyIndex):
+    """highscores.txt as a {username: best score} dict plus a ranking kept in order.
+
+    The ranking is a list of (score, username) sorted with bisect, so top(k) is a
+    slice and a single update is a binary search plus one list insert/delete. A
+    full load fills the dict first and sorts the ranking once. An update is
+    persisted by appending one "username,score" record.
+    """
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        self._best: Dict[str, int] = {}
+        self._ranked: Optional[List[Tuple[int, str]]] = [] # None while a full load is running
+
+    def _clear(self) -> None:
+        self._best.clear()
+        self._ranked = None # Sorted once by _loaded(), not one insort per record
+
+    def _loaded(self) -> None:
+        self._ranked = sorted((s, user) for user, s in self._best.items())
+
+    def _load_record(self, key: str, value: str) -> bool:
+        try:
+            self._place(key, int(value))
+        except ValueError:
+            return False
+        return True
+
+    def _place(self, username: str, score: int) -> None:
+        prev = self._best.get(username)
+        self._best[username] = score
+        if self._ranked is None:
+            return
+        if prev is not None:
+            del self._ranked[bisect.bisect_left(self._ranked, (prev, username))]
+        bisect.insort(self._ranked, (score, username))
+
+    def _live_records(self) -> List[str]:
+        return [f"{user},{s}" for s, user in self._ranked]
+
+    def __len__(self) -> int:
+        return len(self._best)
+
+    def get(self, username: str) -> Optional[int]:
+        with self._lock:
+            self._refresh_if_present()
+            return self._best.get(username)
+
+    def improve(self, username: str, score: int) -> bool:
+        """Records score unless the user's stored one is as good; returns whether it did.
+
+        The comparison runs inside the locked change, so a worse score from another
+        process can never replace a better one.
+        """
+        def change():
+            prev = self._best.get(username)
+            if prev is not None and score >= prev:
+                return None, False
+            self._place(username, score)
+            return f"{username},{score}", True
+        return self._commit(change)
+
+    def top(self, k: int) -> List[Tuple[str, int]]:
+        """The k best (username, score) pairs: fewest attempts, then by name."""
+        with self._lock:
+            self._refresh_if_present()
+            return [(user, s) for s, user in self._ranked[:k]]
+
+    def scores(self) -> Dict[str, int]:
+        with self._lock:
+            self._refresh_if_present()
+            return dict(self._best)
+
+    def replace_all(self, scores: Dict[str, int]) -> None:
+        """Swaps in a whole new leaderboard with one atomic rewrite."""
+        with self._lock, file_lock(self.path):
+            self._write_file([f"{user},{s}" for user, s in scores.items()])
+            self._clear()
+            self._best.update(scores)
+            self._loaded()
+
+
+# --- Player Statistics ---
+
+class PlayerStats(NamedTuple):
+    """One player's totals over every game in the history."""
+    games: int = 0
+    wins: int = 0
+    attempts: int = 0 # Over all games
+    win_attempts: int = 0 # Over won games only
+    streak: int = 0 # Consecutive wins up to the latest game
+    best_streak: int = 0
+    last_played: str = ""
+
+    def add(self, played_at: str, score: int, won: bool) -> "PlayerStats":
+        """Returns the stats with one more game folded in."""
+        streak = self.streak + 1 if won else 0
+        return PlayerStats(self.games + 1, self.wins + won, self.attempts + score,
+                           self.win_attempts + (score if won else 0), streak,
+                           max(self.best_streak, streak), played_at)
+
+    @property
+    def win_rate(self) -> float:
+        return self.wins / self.games if self.games else 0.0
+
+    @property
+    def average_attempts(self) -> float:
+        """Average attempts over won games."""
+        return self.win_attempts / self.wins if self.wins else 0.0
+
+
+def _fold_games(records, max_attempts: int) -> Dict[str, PlayerStats]:
+    """Folds (date, username, score, won) records, oldest first, into per-player stats.
+
+    Text lines written without a won column count as won when they took fewer than
+    max_attempts attempts, as a lost game always records max_attempts.
+    """
+    stats: Dict[str, PlayerStats] = {}
+    empty = PlayerStats()
+    for date, user, score, won in records:
+        if won is None:
+            won = score < max_attempts
+        stats[user] = stats.get(user, empty).add(date, score, won)
+    return stats
+
+
+class PlayerStatsStore(AppendOnlyIndex):
+    """A rollup of PlayerStats per player, kept next to the game history.
+
+    Every saved game appends that player's new totals as one
+    "username,games,wins,attempts,win_attempts,streak,best_streak,last_played"
+    record, so an update costs O(1) and a profile never rescans the history.
+    """
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        self._stats: Dict[str, PlayerStats] = {}
+
+    def _clear(self) -> None:
+        self._stats.clear()
+
+    def _load_record(self, key: str, value: str) -> bool:
+        fields = value.split(",")
+        if len(fields) != len(PlayerStats._fields):
+            return False
+        try:
+            self._stats[key] = PlayerStats(*map(int, fields[:-1]), fields[-1])
+        except ValueError:
+            return False
+        return True
+
+    @staticmethod
+    def _format(stats: PlayerStats) -> str:
+        return ",".join(map(str, stats))
+
+    def _live_records(self) -> List[str]:
+        return [f"{user},{self._format(stats)}" for user, stats in self._stats.items()]
+
+    def __len__(self) -> int:
+        return len(self._stats)
+
+    def get(self, username: str) -> Optional[PlayerStats]:
+        with self._lock:
+            self._refresh_if_present()
+            return self._stats.get(username)
+
+    def _change(self, played_at: str, username: str, score: int, won: bool):
+        def change():
+            stats = self._stats[username] = self._stats.get(username, PlayerStats()).add(played_at, score, won)
+            return f"{username},{self._format(stats)}", stats
+        return change
+
+    def record(self, played_at: str, username: str, score: int, won: bool) -> PlayerStats:
+        """Folds one game into the player's stats and persists them; returns the new stats."""
+        return self._commit(self._change(played_at, username, score, won))
+
+    def record_many(self, games: List[Tuple[str, str, int, bool]]) -> None:
+        """record() for (played_at, username, score, won) games, oldest first, in one commit."""
+        self._commit_many([self._change(*game) for game in games])
+
+    def replace_all(self, stats: Dict[str, PlayerStats]) -> None:
+        """Swaps in a whole new rollup with one atomic rewrite."""
+        with self._lock, file_lock(self.path):
+            self._write_file([f"{user},{self._format(s)}" for user, s in stats.items()])
+            self._stats = dict(stats)
+
+
+_indexes: Dict[Tuple[type, str], Any] = {}
+_indexes_lock = threading.Lock()
+
+
+def _shared_index(cls, path: str):
+    with _indexes_lock: # Two instances for one file would each keep their own view of it
+        index = _indexes.get((cls, path))
+        if index is None:
+            index = _indexes[(cls, path)] = cls(path)
+        return index
+
+
+def get_players_repository(path: str) -> PlayersRepository:
+    """Returns the shared repository for a players file, creating it on first use."""
+    return _shared_index(PlayersRepository, path)
+
+
+def get_leaderboard(path: str) -> Leaderboard:
+    """Returns the shared leaderboard for a highscores file, creating it on first use."""
+    return _shared_index(Leaderboard, path)
+
+
+def get_player_stats_store(path: str) -> PlayerStatsStore:
+    """Returns the shared stats rollup for a file, creating it on first use."""
+    return _shared_index(PlayerStatsStore, path)
+
+
+def get_user_directory(players_path: str) -> UserDirectory:
+    """Returns the shared compiled directory for a players file."""
+    return _shared_index(UserDirectory, players_path)
+
+
+def get_append_log(path: str) -> AppendLog:
+    """Returns the shared append log for a file, creating it on first use."""
+    return _shared_index(AppendLog, path)
+
+
+def stats_path_for(history_path: str) -> str:
+    """The rollup file kept next to a history file, e.g. game_history.txt.stats."""
+    return history_path + ".stats"
+
+
+# --- Binary Game History ---
+
+_EPOCH = datetime(1970, 1, 1)
+# "HH:MM:" for each minute of the day and "SS" for each second, so formatting a
+# time is two lookups and a concatenation instead of an f-string with format specs
+_HOUR_MINUTE = [f"{h:02d}:{m:02d}:" for h in range(24) for m in range(60)]
+_SECOND = [f"{s:02d}" for s in range(60)]
+
+
+@lru_cache(maxsize=4096)
+def _day_number(date: str) -> int:
+    return (datetime.strptime(date, "%Y-%m-%d") - _EPOCH).days
+
+
+@lru_cache(maxsize=4096)
+def _day_text(day: int) -> str:
+    return (_EPOCH + timedelta(days=day)).strftime("%Y-%m-%d")
+
+
+def timestamp_to_epoch(timestamp: str) -> int:
+    """"YYYY-MM-DD HH:MM:SS" wall-clock time -> seconds since 1970, counted as UTC."""
+    if len(timestamp) != 19 or timestamp[10] != " " or timestamp[13] != ":" or timestamp[16] != ":":
+        raise ValueError(f"Bad timestamp '{timestamp}'")
+    return (_day_number(timestamp[:10]) * 86400 + int(timestamp[11:13]) * 3600
+            + int(timestamp[14:16]) * 60 + int(timestamp[17:19]))
+
+
+def epoch_to_timestamp(epoch: int) -> str:
+    day, seconds = divmod(epoch, 86400)
+    minute, second = divmod(seconds, 60)
+    return f"{_day_text(day)} " + _HOUR_MINUTE[minute] + _SECOND[second]
+
+
+@lru_cache(maxsize=1)
+def _time_chars() -> "np.ndarray":
+    """The 10 bytes of " HH:MM:SS" plus a newline for each second of the day (864 KB)."""
+    text = "".join(f" {hm}{s}\n" for hm in _HOUR_MINUTE for s in _SECOND)
+    return np.frombuffer(text.encode("ascii"), dtype=np.uint8).reshape(-1, 10)
+
+
+def _format_timestamps(epochs: "np.ndarray") -> List[str]:
+    """epoch_to_timestamp() for a whole array: the text of every record is gathered
+    into one byte buffer from per-day and per-second tables, then decoded and split once."""
+    days, seconds = np.divmod(epochs.astype(np.int64), 86400)
+    unique_days, day_index = np.unique(days, return_inverse=True)
+    day_chars = np.frombuffer("".join(_day_text(int(day)) for day in unique_days).encode("ascii"),
+                              dtype=np.uint8).reshape(-1, 10)
+    chars = np.hstack([day_chars.take(day_index, axis=0), _time_chars().take(seconds, axis=0)])
+    return chars.tobytes().decode("ascii").split("\n")[:-1]
+
+
+class GameRecords(Sequence):
+    """The (date, username, score) records of a binary history, decoded on access.
+
+    Loading is one bulk read into an array; the strings for a record are only built
+    when it is indexed or iterated over. With NumPy, iterating decodes DECODE_CHUNK
+    records at a time in bulk.
+    """
+
+    DECODE_CHUNK = 8192 # Records per bulk decode; small enough for its buffers to stay in cache
+
+    def __init__(self, words: array, names: List[str]):
+        self._words = words # epoch, packed, epoch, packed, ...
+        self._names = names
+
+    def __len__(self) -> int:
+        return len(self._words) // 2
+
+    def _record(self, epoch: int, packed: int) -> Tuple[str, str, int]:
+        return epoch_to_timestamp(epoch), self._names[packed >> 8], packed & 0x7F
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("game record index out of range")
+        return self._record(self._words[2 * index], self._words[2 * index + 1])
+
+    def __iter__(self) -> Iterator[Tuple[str, str, int]]:
+        if np is None or not self._words:
+            return self._iter_each()
+        # Chaining the zips keeps any Python frame out of the per-record path
+        return itertools.chain.from_iterable(self._decode_chunks())
+
+    def _decode_chunks(self) -> Iterator[Iterator[Tuple[str, str, int]]]:
+        words = np.frombuffer(self._words, dtype=np.uint32)
+        names = np.array(self._names, dtype=object)
+        for start in range(0, len(words), 2 * self.DECODE_CHUNK):
+            chunk = words[start:start + 2 * self.DECODE_CHUNK]
+            packed = chunk[1::2]
+            yield zip(_format_timestamps(chunk[0::2]), names[packed >> 8].tolist(), (packed & 0x7F).tolist())
+
+    def _iter_each(self) -> Iterator[Tuple[str, str, int]]:
+        # Records are in time order, so the date part only changes once a day
+        names, day, date = self._names, None, ""
+        for epoch, packed in zip(self._words[0::2], self._words[1::2]):
+            epoch_day, seconds = divmod(epoch, 86400)
+            if epoch_day != day:
+                day, date = epoch_day, _day_text(epoch_day) + " "
+            minute, second = divmod(seconds, 60)
+            yield date + _HOUR_MINUTE[minute] + _SECOND[second], names[packed >> 8], packed & 0x7F
+
+    def won(self, index: int) -> bool:
+        return bool(self._words[2 * index + 1] & 0x80)
+
+    def raw(self) -> Iterator[Tuple[int, int, int, bool]]:
+        """Yields (epoch, user_id, score, won) without building any strings."""
+        for epoch, packed in zip(self._words[0::2], self._words[1::2]):
+            yield epoch, packed >> 8, packed & 0x7F, bool(packed & 0x80)
+
+
+class BinaryHistory:
+    """Game history as fixed-width 8-byte records plus a table of interned usernames.
+
+    After an 8-byte header, each record is two little-endian uint32s: the time the
+    game was saved in seconds since 1970, and user_id << 8 | won << 7 | attempts.
+    The time is the local wall-clock time counted as if it were UTC, so it turns back
+    into the same "YYYY-MM-DD HH:MM:SS" text with plain arithmetic. user_id is the
+    line number of the name in "<path>.names", which is only ever appended to, and a
+    name is written there before any record refers to it.
+    """
+
+    MAGIC = b"MMGH\x01\x00\x00\x00"
+    RECORD = struct.Struct("<II")
+    MAX_USERS = 1 << 24
+    MAX_ATTEMPTS = 0x7F
+
+    def __init__(self, path: str):
+        self.path = path
+        self.names_path = path + ".names"
+        self._names: List[str] = []
+        self._ids: Dict[str, int] = {}
+        self._names_stamp: Optional[Tuple[int, int]] = None # (inode, bytes read)
+        self._lock = threading.RLock()
+        self._group = GroupCommit(self._write_batch)
+
+    # Interned usernames
+    def _refresh_names(self) -> None:
+        try:
+            st = os.stat(self.names_path)
+        except FileNotFoundError:
+            st = None
+        if st is None or self._names_stamp is None or st.st_ino != self._names_stamp[0] \
+                or st.st_size < self._names_stamp[1]:
+            # Replaced (e.g. by convert_text_history): start a fresh list, since
+            # GameRecords already handed out keep referring to the old one
+            self._names, self._ids = [], {}
+            self._names_stamp = None
+            if st is None:
+                return
+        offset = self._names_stamp[1] if self._names_stamp else 0
+        if st.st_size == offset:
+            return
+        with open(self.names_path, "rb") as f:
+            f.seek(offset)
+            data = f.read(st.st_size - offset)
+        complete = data.rfind(b"\n") + 1 # A name still being written is read next time
+        for name in data[:complete].decode("utf-8").split("\n")[:-1]:
+            self._ids.setdefault(name, len(self._names))
+            self._names.append(name)
+        self._names_stamp = (st.st_ino, offset + complete)
+
+    def _intern(self, usernames: List[str]) -> None:
+        """Adds any new usernames to the names file; the caller holds the file lock."""
+        self._refresh_names()
+        new = list(dict.fromkeys(u for u in usernames if u not in self._ids))
+        if not new:
+            return
+        if len(self._names) + len(new) > self.MAX_USERS:
+            raise StorageError(f"{self.names_path} would exceed {self.MAX_USERS} usernames")
+        _append_fsynced(self.names_path, new)
+        self._refresh_names()
+
+    def username(self, user_id: int) -> str:
+        with self._lock:
+            self._refresh_names()
+            return self._names[user_id]
+
+    # Records
+    @classmethod
+    def pack(cls, epoch: int, user_id: int, score: int, won: bool) -> bytes:
+        if not 0 <= score <= cls.MAX_ATTEMPTS:
+            raise ValueError(f"Attempt count {score} does not fit the binary history format")
+        return cls.RECORD.pack(epoch, user_id << 8 | bool(won) << 7 | score)
+
+    def _records(self, data: bytes) -> GameRecords:
+        """Wraps the whole records in data, dropping any that name an unknown user."""
+        words = array("I")
+        words.frombytes(data[:len(data) - len(data) % self.RECORD.size])
+        if sys.byteorder == "big":
+            words.byteswap()
+        self._refresh_names()
+        n_names = len(self._names)
+        if words and self._max_user_id(words) >= n_names:
+            kept = [(epoch, packed) for epoch, packed in zip(words[0::2], words[1::2])
+                    if packed >> 8 < n_names]
+            words = array("I", [word for pair in kept for word in pair])
+        return GameRecords(words, self._names)
+
+    @staticmethod
+    def _max_user_id(words: array) -> int:
+        if np is not None:
+            return int(np.frombuffer(words, dtype=np.uint32)[1::2].max()) >> 8
+        return max(words[1::2]) >> 8
+
+    def append(self, timestamp: str, username: str, score: int, won: bool = True) -> None:
+        """Returns once the game is on disk; concurrent appends are group committed."""
+        self._group.submit((timestamp, username, score, won))
+
+    def extend(self, games: List[Tuple[str, str, int, bool]]) -> None:
+        self._group.submit_many(games)
+
+    def _write_batch(self, games: List[Tuple[str, str, int, bool]]) -> List[Any]:
+        results: List[Any] = []
+        valid = []
+        for timestamp, username, score, won in games:
+            try:
+                self.pack(0, 0, score, won)
+                valid.append((timestamp_to_epoch(timestamp), username, score, won))
+                results.append(None)
+            except ValueError as e:
+                results.append(e)
+        if not valid:
+            return results
+        with self._lock, file_lock(self.path):
+            # Names go to disk before the records that refer to them
+            self._intern([username for _, username, _, _ in valid])
+            data = b"".join(self.pack(epoch, self._ids[username], score, won)
+                            for epoch, username, score, won in valid)
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "a+b") as f:
+                size = f.seek(0, os.SEEK_END)
+                if size < len(self.MAGIC):
+                    f.truncate(0)
+                    data = self.MAGIC + data
+                elif (size - len(self.MAGIC)) % self.RECORD.size:
+                    f.truncate(size - (size - len(self.MAGIC)) % self.RECORD.size) # Torn write
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+        return results
+
+    def _check_header(self, f) -> None:
+        header = f.read(len(self.MAGIC))
+        if header and header != self.MAGIC:
+            raise StorageError(f"{self.path} is not a binary game history file")
+
+    def load(self) -> GameRecords:
+        """Returns every record, oldest first."""
+        with self._lock:
+            try:
+                with open(self.path, "rb") as f:
+                    self._check_header(f)
+                    data = f.read()
+            except FileNotFoundError:
+                data = b""
+            return self._records(data)
+
+    def iter_recent(self, block_records: int = 4096) -> Iterator[Tuple[str, str, int]]:
+        """Yields records newest first, reading block_records records at a time from the end."""
+        try:
+            with open(self.path, "rb") as f:
+                self._check_header(f)
+                end = f.seek(0, os.SEEK_END)
+                pos = end - (end - len(self.MAGIC)) % self.RECORD.size
+                while pos > len(self.MAGIC):
+                    size = min(block_records * self.RECORD.size, pos - len(self.MAGIC))
+                    pos -= size
+                    f.seek(pos)
+                    data = f.read(size)
+                    with self._lock:
+                        records = self._records(data)
+                    yield from reversed(records)
+        except FileNotFoundError:
+            return
+
+
+def convert_text_history(text_path: str, binary_path: str, max_attempts: int = 10) -> int:
+    """Writes a text game history out in the binary format; returns the records written.
+
+    Lines written without a won column count as won when they took fewer than
+    max_attempts attempts (a lost game always records max_attempts). Both output files
+    are replaced atomically, names first, so readers never see a record without its name.
+    """
+    ids: Dict[str, int] = {}
+    tmp_names, tmp_records = f"{binary_path}.names.tmp", f"{binary_path}.tmp"
+    count = 0
+    with open(tmp_records, "wb") as out:
+        out.write(BinaryHistory.MAGIC)
+        chunk = []
+        try:
+            with open(text_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    record = _parse_game(line) if line.strip() else None
+                    if record is None:
+                        continue
+                    date, user, score, won = record
+                    user_id = ids.setdefault(user, len(ids))
+                    chunk.append(BinaryHistory.pack(timestamp_to_epoch(date), user_id, score,
+                                                    score < max_attempts if won is None else won))
+                    if len(chunk) >= 65536:
+                        out.write(b"".join(chunk))
+                        count += len(chunk)
+                        chunk = []
+        except FileNotFoundError:
+            pass
+        out.write(b"".join(chunk))
+        count += len(chunk)
+        out.flush()
+        os.fsync(out.fileno())
+    if len(ids) > BinaryHistory.MAX_USERS:
+        os.remove(tmp_records)
+        raise StorageError(f"{text_path} has more than {BinaryHistory.MAX_USERS} usernames")
+    with open(tmp_names, "w", encoding="utf-8") as f:
+        f.writelines(name + "\n" for name in ids) # dicts keep insertion order = user id
+        f.flush()
+        os.fsync(f.fileno())
+    with file_lock(binary_path):
+        os.replace(tmp_names, binary_path + ".names")
+        os.replace(tmp_records, binary_path)
+    return count
+
+
+def get_binary_history(path: str) -> BinaryHistory:
+    """Returns the shared binary history for a file, creating it on first use."""
+    return _shared_index(BinaryHistory, path)
+
+
+# --- Storage Backends ---
+
+class StorageError(IOError):
+    """A backend failed to read or write; an IOError so callers handle it like file errors."""
+
+
+class StorageBackend(ABC):
+    """Everything the game needs from its players, highscores and game history store."""
+
+    @abstractmethod
+    def user_exists(self, username: str) -> bool: ...
+
+    @abstractmethod
+    def get_password(self, username: str) -> Optional[str]:
+        """Returns the stored (encrypted) password, or None for an unknown user."""
+
+    @abstractmethod
+    def add_user(self, username: str, stored_pw: str) -> bool:
+        """Returns False if the username is taken; raises ValueError if it does not follow USERNAME_RULE."""
+
+    def add_users(self, users: List[Tuple[str, str]]) -> int:
+        """Adds the (username, stored_pw) users not registered yet; returns how many were added."""
+        return sum(self.add_user(username, stored_pw) for username, stored_pw in users)
+
+    @abstractmethod
+    def users(self) -> Iterator[Tuple[str, str]]:
+        """Yields every (username, stored password) pair once."""
+
+    def usernames(self) -> Iterator[str]:
+        """Yields every registered username once."""
+        return (username for username, _ in self.users())
+
+    @abstractmethod
+    def set_password(self, username: str, stored_pw: str) -> bool:
+        """Changes a user's password; returns False for an unknown user."""
+
+    @abstractmethod
+    def load_highscores(self) -> Dict[str, int]: ...
+
+    @abstractmethod
+    def save_highscores(self, scores: Dict[str, int]) -> None:
+        """Replaces the whole leaderboard."""
+
+    @abstractmethod
+    def get_highscore(self, username: str) -> Optional[int]: ...
+
+    @abstractmethod
+    def improve_highscore(self, username: str, score: int) -> bool:
+        """Stores score if it beats the user's best (fewer attempts); returns whether it did."""
+
+    @abstractmethod
+    def top_scores(self, k: int) -> List[Tuple[str, int]]:
+        """Returns the k best (username, score) pairs: fewest attempts, then by name."""
+
+    @abstractmethod
+    def append_game(self, timestamp: str, username: str, score: int, won: bool = True) -> None:
+        """Records one game; formats without a won column ignore won."""
+
+    def append_games(self, games: List[Tuple[str, str, int, bool]]) -> None:
+        """append_game() for several (timestamp, username, score, won) games, oldest first."""
+        for game in games:
+            self.append_game(*game)
+
+    @abstractmethod
+    def load_game_history(self) -> List[Tuple[str, str, int]]:
+        """Returns every (date, username, score) record, oldest first."""
+
+    @abstractmethod
+    def iter_recent_games(self) -> Iterator[Tuple[str, str, int]]:
+        """Yields (date, username, score) records newest first, reading lazily."""
+
+    @abstractmethod
+    def get_player_stats(self, username: str) -> Optional[PlayerStats]:
+        """Returns the player's rollup (kept up to date by append_game), or None."""
+
+    @abstractmethod
+    def rebuild_player_stats(self, max_attempts: int) -> int:
+        """Regenerates every player's stats from the history in one streaming pass.
+
+        max_attempts decides won/lost for old records without a won flag. Returns the
+        number of players.
+        """
+
+
+class TextFileStorage(StorageBackend):
+    """The original comma-separated text files."""
+
+    def __init__(self, players_path: str, highscores_path: str, history_path: str):
+        self.players = get_players_repository(players_path)
+        self.directory = get_user_directory(players_path)
+        self.leaderboard = get_leaderboard(highscores_path)
+        self.history_path = history_path
+        self.history_log = get_append_log(history_path)
+        self.stats = get_player_stats_store(stats_path_for(history_path))
+
+    def user_exists(self, username: str) -> bool:
+        try:
+            return self.get_password(username) is not None
+        except FileNotFoundError:
+            return False
+
+    def get_password(self, username: str) -> Optional[str]:
+        # Lookups go to the compiled directory when one is built and current, so
+        # this process never has to load the whole players file
+        if self.directory.is_current():
+            return self.directory.get_password(username)
+        return self.players.get_password(username)
+
+    def add_user(self, username: str, stored_pw: str) -> bool:
+        return self.players.add(username, stored_pw)
+
+    def add_users(self, users: List[Tuple[str, str]]) -> int:
+        return self.players.add_many(users)
+
+    def users(self) -> Iterator[Tuple[str, str]]:
+        return self.players.users()
+
+    def usernames(self) -> Iterator[str]:
+        return self.players.usernames()
+
+    def set_password(self, username: str, stored_pw: str) -> bool:
+        return self.players.set_password(username, stored_pw)
+
+    def load_highscores(self) -> Dict[str, int]:
+        return self.leaderboard.scores()
+
+    def save_highscores(self, scores: Dict[str, int]) -> None:
+        self.leaderboard.replace_all(scores)
+
+    def get_highscore(self, username: str) -> Optional[int]:
+        return self.leaderboard.get(username)
+
+    def improve_highscore(self, username: str, score: int) -> bool:
+        return self.leaderboard.improve(username, score)
+
+    def top_scores(self, k: int) -> List[Tuple[str, int]]:
+        return self.leaderboard.top(k)
+
+    def append_game(self, timestamp: str, username: str, score: int, won: bool = True) -> None:
+        self.history_log.append(f"{timestamp},{username},{score},{int(won)}")
+        self.stats.record(timestamp, username, score, won)
+
+    def append_games(self, games: List[Tuple[str, str, int, bool]]) -> None:
+        self.history_log.extend([f"{timestamp},{username},{score},{int(won)}"
+                                 for timestamp, username, score, won in games])
+        self.stats.record_many(games)
+
+    def load_game_history(self) -> List[Tuple[str, str, int]]:
+        history = []
+        try:
+            with open(self.history_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    parts = line.split(",")
+                    if len(parts) not in (3, 4):
+                        continue
+                    try:
+                        history.append((parts[0], parts[1], int(parts[2])))
+                    except ValueError:
+                        continue
+        except FileNotFoundError:
+            pass
+        return history
+
+    def iter_recent_games(self) -> Iterator[Tuple[str, str, int]]:
+        # save_game_result only appends, so the file is already in date order and
+        # reading it backwards gives newest first without a sort.
+        try:
+            for line in iter_lines_reverse(self.history_path):
+                record = _parse_game(line)
+                if record is not None:
+                    yield record[:3]
+        except FileNotFoundError:
+            return
+
+    def get_player_stats(self, username: str) -> Optional[PlayerStats]:
+        return self.stats.get(username)
+
+    def _iter_games(self) -> Iterator[Tuple[str, str, int, Optional[bool]]]:
+        try:
+            with open(self.history_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    record = _parse_game(line)
+                    if record is not None:
+                        yield record
+        except FileNotFoundError:
+            return
+
+    def rebuild_player_stats(self, max_attempts: int) -> int:
+        stats = _fold_games(self._iter_games(), max_attempts)
+        self.stats.replace_all(stats)
+        return len(stats)
+
+
+class BinaryHistoryStorage(TextFileStorage):
+    """The text players and highscores files, with game history in BinaryHistory format."""
+
+    def __init__(self, players_path: str, highscores_path: str, history_path: str):
+        super().__init__(players_path, highscores_path, history_path)
+        self.history = get_binary_history(history_path)
+
+    def append_game(self, timestamp: str, username: str, score: int, won: bool = True) -> None:
+        self.history.append(timestamp, username, score, won)
+        self.stats.record(timestamp, username, score, won)
+
+    def append_games(self, games: List[Tuple[str, str, int, bool]]) -> None:
+        self.history.extend(games)
+        self.stats.record_many(games)
+
+    def load_game_history(self) -> Sequence[Tuple[str, str, int]]:
+        return self.history.load()
+
+    def iter_recent_games(self) -> Iterator[Tuple[str, str, int]]:
+        return self.history.iter_recent()
+
+    def rebuild_player_stats(self, max_attempts: int) -> int:
+        # Fold by user id on the raw integers; last_played holds the epoch until the
+        # end, so each player's date is formatted once instead of once per game.
+        records = self.history.load()
+        by_id: Dict[int, PlayerStats] = {}
+        empty = PlayerStats()
+        for epoch, user_id, score, won in records.raw():
+            by_id[user_id] = by_id.get(user_id, empty).add(epoch, score, won)
+        stats = {self.history.username(user_id): s._replace(last_played=epoch_to_timestamp(s.last_played))
+                 for user_id, s in by_id.items()}
+        self.stats.replace_all(stats)
+        return len(stats)
+
+
+class SQLiteStorage(StorageBackend):
+    """A single SQLite database in WAL mode, so readers never block the writer.
+
+    Each thread gets its own connection. Leaderboard and history queries are served
+    by indexes instead of full scans, and sqlite3 errors surface as StorageError.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS players (
+            username TEXT PRIMARY KEY,
+            password TEXT NOT NULL
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS highscores (
+            username TEXT PRIMARY KEY,
+            score INTEGER NOT NULL
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS highscores_by_score ON highscores (score, username);
+        CREATE TABLE IF NOT EXISTS games (
+            id INTEGER PRIMARY KEY,
+            played_at TEXT NOT NULL,
+            username TEXT NOT NULL,
+            score INTEGER NOT NULL,
+            won INTEGER
+        );
+        DROP INDEX IF EXISTS games_by_user;
+        CREATE TABLE IF NOT EXISTS player_stats (
+            username TEXT PRIMARY KEY,
+            games INTEGER NOT NULL,
+            wins INTEGER NOT NULL,
+            attempts INTEGER NOT NULL,
+            win_attempts INTEGER NOT NULL,
+            streak INTEGER NOT NULL,
+            best_streak INTEGER NOT NULL,
+            last_played TEXT NOT NULL
+        ) WITHOUT ROWID;
+    """
+    # The right-hand sides see the row as it was before the update.
+    RECORD_STATS = """
+        INSERT INTO player_stats VALUES (?, 1, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (username) DO UPDATE SET
+            games = games + 1,
+            wins = wins + excluded.wins,
+            attempts = attempts + excluded.attempts,
+            win_attempts = win_attempts + excluded.win_attempts,
+            streak = CASE WHEN excluded.wins THEN streak + 1 ELSE 0 END,
+            best_streak = MAX(best_streak, CASE WHEN excluded.wins THEN streak + 1 ELSE 0 END),
+            last_played = excluded.last_played
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._execute_script(self.SCHEMA)
+        if "won" not in [row[1] for row in self._query("PRAGMA table_info(games)")]:
+            self._write("ALTER TABLE games ADD COLUMN won INTEGER") # Databases from before won
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _execute_script(self, script: str) -> None:
+        try:
+            self._connection().executescript(script)
+        except sqlite3.Error as e:
+            raise StorageError(f"{self.path}: {e}") from e
+
+    def _query(self, sql: str, params: tuple = ()) -> List[tuple]:
+        try:
+            return self._connection().execute(sql, params).fetchall()
+        except sqlite3.Error as e:
+            raise StorageError(f"{self.path}: {e}") from e
+
+    def _write(self, sql: str, params: tuple = ()) -> int:
+        """Runs one statement in its own transaction; returns the affected row count."""
+        try:
+            with self._connection() as conn:
+                return conn.execute(sql, params).rowcount
+        except sqlite3.Error as e:
+            raise StorageError(f"{self.path}: {e}") from e
+
+    def user_exists(self, username: str) -> bool:
+        return bool(self._query("SELECT 1 FROM players WHERE username = ?", (username,)))
+
+    def get_password(self, username: str) -> Optional[str]:
+        rows = self._query("SELECT password FROM players WHERE username = ?", (username,))
+        return rows[0][0] if rows else None
+
+    def add_user(self, username: str, stored_pw: str) -> bool:
+        check_player(username, stored_pw)
+        return self._write("INSERT OR IGNORE INTO players (username, password) VALUES (?, ?)",
+                           (username, stored_pw)) > 0
+
+    def add_users(self, users: List[Tuple[str, str]]) -> int:
+        for username, stored_pw in users:
+            check_player(username, stored_pw)
+        try:
+            with self._connection() as conn:
+                conn.execute("BEGIN")
+                before = conn.total_changes
+                conn.executemany("INSERT OR IGNORE INTO players (username, password) VALUES (?, ?)", users)
+                return conn.total_changes - before
+        except sqlite3.Error as e:
+            raise StorageError(f"{self.path}: {e}") from e
+
+    def users(self) -> Iterator[Tuple[str, str]]:
+        try:
+            # Iterating the cursor streams the rows instead of fetching them all
+            yield from self._connection().execute("SELECT username, password FROM players")
+        except sqlite3.Error as e:
+            raise StorageError(f"{self.path}: {e}") from e
+
+    def set_password(self, username: str, stored_pw: str) -> bool:
+        check_player(username, stored_pw)
+        return self._write("UPDATE players SET password = ? WHERE username = ?",
+                           (stored_pw, username)) > 0
+
+    def load_highscores(self) -> Dict[str, int]:
+        return dict(self._query("SELECT username, score FROM highscores"))
+
+    def save_highscores(self, scores: Dict[str, int]) -> None:
+        try:
+            with self._connection() as conn:
+                conn.execute("BEGIN")
+                conn.execute("DELETE FROM highscores")
+                conn.executemany("INSERT INTO highscores (username, score) VALUES (?, ?)", scores.items())
+        except sqlite3.Error as e:
+            raise StorageError(f"{self.path}: {e}") from e
+
+    def get_highscore(self, username: str) -> Optional[int]:
+        rows = self._query("SELECT score FROM highscores WHERE username = ?", (username,))
+        return rows[0][0] if rows else None
+
+    def improve_highscore(self, username: str, score: int) -> bool:
+        return self._write("INSERT INTO highscores (username, score) VALUES (?, ?) "
+                           "ON CONFLICT (username) DO UPDATE SET score = excluded.score "
+                           "WHERE excluded.score < highscores.score", (username, score)) > 0
+
+    def top_scores(self, k: int) -> List[Tuple[str, int]]:
+        return self._query("SELECT username, score FROM highscores ORDER BY score, username LIMIT ?", (k,))
+
+    def append_game(self, timestamp: str, username: str, score: int, won: bool = True) -> None:
+        self.append_games([(timestamp, username, score, won)])
+
+    def append_games(self, games: List[Tuple[str, str, int, bool]]) -> None:
+        games = [(timestamp, username, score, int(won)) for timestamp, username, score, won in games]
+        try:
+            with self._connection() as conn:
+                conn.execute("BEGIN")
+                conn.executemany("INSERT INTO games (played_at, username, score, won) VALUES (?, ?, ?, ?)", games)
+                conn.executemany(self.RECORD_STATS, [(username, won, score, score * won, won, won, timestamp)
+                                                     for timestamp, username, score, won in games])
+        except sqlite3.Error as e:
+            raise StorageError(f"{self.path}: {e}") from e
+
+    def load_game_history(self) -> List[Tuple[str, str, int]]:
+        return self._query("SELECT played_at, username, score FROM games ORDER BY id")
+
+    def iter_recent_games(self, page_size: int = 100) -> Iterator[Tuple[str, str, int]]:
+        # Keyset pagination on the rowid: each page is an index range scan.
+        last_id = None
+        while True:
+            if last_id is None:
+                rows = self._query("SELECT id, played_at, username, score FROM games "
+                                   "ORDER BY id DESC LIMIT ?", (page_size,))
+            else:
+                rows = self._query("SELECT id, played_at, username, score FROM games "
+                                   "WHERE id < ? ORDER BY id DESC LIMIT ?", (last_id, page_size))
+            for row in rows:
+                yield row[1:]
+            if len(rows) < page_size:
+                return
+            last_id = rows[-1][0]
+
+    def get_player_stats(self, username: str) -> Optional[PlayerStats]:
+        rows = self._query("SELECT games, wins, attempts, win_attempts, streak, best_streak, last_played "
+                           "FROM player_stats WHERE username = ?", (username,))
+        return PlayerStats(*rows[0]) if rows else None
+
+    def rebuild_player_stats(self, max_attempts: int) -> int:
+        try:
+            with self._connection() as conn:
+                conn.execute("BEGIN")
+                # Iterating the cursor streams the rows instead of fetching them all
+                games = ((date, user, score, None if won is None else bool(won)) for date, user, score, won
+                         in conn.execute("SELECT played_at, username, score, won FROM games ORDER BY id"))
+                stats = _fold_games(games, max_attempts)
+                conn.execute("DELETE FROM player_stats")
+                conn.executemany("INSERT INTO player_stats VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                                 ((user, *s) for user, s in stats.items()))
+        except sqlite3.Error as e:
+            raise StorageError(f"{self.path}: {e}") from e
+        return len(stats)
+
+
+# --- Write-Behind Writer ---
+
+class WriteBehindWriter:
+    """Applies game results to storage from a background thread, in batches.
+
+    Writes queue up and are flushed once max_batch are waiting or the oldest has
+    waited max_delay seconds. Games go through append_games, so a batch costs one
+    locked write and one fsync per file. Until a write is flushed, pending_games()
+    and pending_highscores() let readers show it anyway. close() drains the queue.
+    """
+
+    def __init__(self, max_batch: int = 64, max_delay: float = 0.5):
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._queue: List[Tuple[StorageBackend, str, tuple]] = [] # (backend, kind, args)
+        self._writing: List[Tuple[StorageBackend, str, tuple]] = [] # Batch being written now
+        self._oldest = 0.0 # time.monotonic() when the oldest queued write arrived
+        self._closed = False
+        self._cond = threading.Condition()
+        self._write_lock = threading.Lock() # Held while a batch is written
+        self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._thread.start()
+
+    def _submit(self, backend: StorageBackend, kind: str, args: tuple) -> None:
+        with self._cond:
+            if self._closed:
+                raise StorageError("The result writer is closed")
+            if not self._queue:
+                self._oldest = time.monotonic()
+            self._queue.append((backend, kind, args))
+            if len(self._queue) == 1 or len(self._queue) >= self.max_batch:
+                self._cond.notify_all() # Start the delay timer, or flush a full batch
+
+    def append_game(self, backend: StorageBackend, timestamp: str, username: str,
+                    score: int, won: bool = True) -> None:
+        self._submit(backend, "game", (timestamp, username, score, won))
+
+    def improve_highscore(self, backend: StorageBackend, username: str, score: int) -> None:
+        self._submit(backend, "highscore", (username, score))
+
+    def _pending(self, backend: StorageBackend, kind: str) -> List[tuple]:
+        with self._cond:
+            return [args for b, k, args in self._writing + self._queue if b is backend and k == kind]
+
+    def pending_games(self, backend: StorageBackend) -> List[Tuple[str, str, int, bool]]:
+        """(timestamp, username, score, won) games not yet flushed, oldest first."""
+        return self._pending(backend, "game")
+
+    def pending_highscores(self, backend: StorageBackend) -> Dict[str, int]:
+        return dict(self._pending(backend, "highscore"))
+
+    @contextmanager
+    def holding_writes(self) -> Iterator[None]:
+        """Keeps batches from being written meanwhile, so pending and stored views agree."""
+        with self._write_lock:
+            yield
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._closed and (not self._queue or len(self._queue) < self.max_batch
+                                            and time.monotonic() - self._oldest < self.max_delay):
+                    self._cond.wait(None if not self._queue
+                                    else self.max_delay - (time.monotonic() - self._oldest))
+                if not self._queue:
+                    return # Closed and drained
+                self._writing, self._queue = self._queue, []
+            with self._write_lock:
+                self._write(self._writing)
+                with self._cond:
+                    self._writing = []
+                    self._cond.notify_all()
+
+    @staticmethod
+    def _write(batch: List[Tuple[StorageBackend, str, tuple]]) -> None:
+        games: Dict[StorageBackend, List[tuple]] = {}
+        for backend, kind, args in batch:
+            if kind == "game":
+                games.setdefault(backend, []).append(args)
+        # One failing backend or write must not cost the rest of the batch
+        for backend, backend_games in games.items():
+            try:
+                backend.append_games(backend_games)
+            except (IOError, ValueError) as e:
+                print(f"Error saving game results: {e}")
+        for backend, kind, args in batch:
+            if kind == "highscore":
+                try:
+                    backend.improve_highscore(*args)
+                except (IOError, ValueError) as e:
+                    print(f"Error saving the highscore for {args[0]}: {e}")
+
+    def flush(self) -> None:
+        """Writes everything queued so far and waits until it is on disk."""
+        with self._cond:
+            self._oldest = -self.max_delay # Due now
+            self._cond.notify_all()
+            while self._queue or self._writing:
+                self._cond.wait()
+
+    def close(self) -> None:
+        """Drains the queue and stops the thread; later writes raise StorageError."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+
+
+_backends: Dict[tuple, StorageBackend] = {}
+_backends_lock = threading.Lock()
+
+
+def get_storage(spec: str, players_path: str, highscores_path: str, history_path: str) -> StorageBackend:
+    """Returns the shared backend for a spec: "text", "binary[:<history path>]" or
+    "sqlite:<database path>". The binary history defaults to history_path with a .bin suffix.
+    """
+    key = (spec, players_path, highscores_path, history_path)
+    with _backends_lock:
+        backend = _backends.get(key)
+        if backend is None:
+            kind, _, target = spec.partition(":")
+            if kind == "text":
+                backend = TextFileStorage(players_path, highscores_path, history_path)
+            elif kind == "binary":
+                backend = BinaryHistoryStorage(players_path, highscores_path,
+                                               target or os.path.splitext(history_path)[0] + ".bin")
+            elif kind == "sqlite":
+                backend = SQLiteStorage(target or "mastermind.db")
+            else:
+                raise ValueError(f"Unknown storage backend '{spec}'")
+            _backends[key] = backend
+        return backend
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintenance commands for Mastermind storage.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    convert = commands.add_parser("convert-history", help="convert a text game history to the binary format")
+    convert.add_argument("source", nargs="?", default="game_history.txt")
+    convert.add_argument("target", nargs="?", default="game_history.bin")
+    convert.add_argument("--max-attempts", type=int, default=10,
+                         help="attempt count recorded for lost games (default: 10)")
+    directory = commands.add_parser("build-directory", help="compile players.txt into a sorted, mmap-able index")
+    directory.add_argument("players", nargs="?", default="players.txt")
+    rebuild = commands.add_parser("rebuild-stats", help="regenerate the per-player stats from the game history")
+    rebuild.add_argument("--storage", default=os.environ.get("MASTERMIND_STORAGE", "text"),
+                         help='"text", "binary[:<path>]" or "sqlite:<path>" (default: $MASTERMIND_STORAGE or text)')
+    rebuild.add_argument("--history", default="game_history.txt", help="text game history file")
+    rebuild.add_argument("--max-attempts", type=int, default=10,
+                         help="attempt count recorded for lost games (default: 10)")
+    args = parser.parse_args()
+
+    if args.command == "convert-history":
+        n = convert_text_history(args.source, args.target, args.max_attempts)
+        print(f"Wrote {n} games to {args.target} ({os.path.getsize(args.target)} bytes, "
+              f"was {os.path.getsize(args.source) if os.path.exists(args.source) else 0})")
+    elif args.command == "build-directory":
+        n = UserDirectory.build(args.players)
+        print(f"Compiled {n} users into {UserDirectory.path_for(args.players)}")
+    elif args.command == "rebuild-stats":
+        backend = get_storage(args.storage, "players.txt", "highscores.txt", args.history)
+        print(f"Rebuilt stats for {backend.rebuild_player_stats(args.max_attempts)} players")
@@ -0,0 +1,187 @@
+"""Username suggestions that are checked against the registered players.
+
+Suggestions come from namespaces of fixed-shape names, such as "aaa999" (three
+lowercase letters, then three digits: 17.5M names). A Bloom filter of every
+registered username is built once from the backend. It is a negative cache:
+a candidate it has never seen is free, one it may have seen is drawn again, so
+a suggestion costs one exact lookup, for the chosen name, however many players
+there are. That lookup catches users registered by other processes since the
+build. Once a namespace is MAX_FULLNESS full, suggestions move to the next,
+longer one, so the number of draws stays small.
+
+Run this file to see how full each namespace is:
+    python mastermind_usernames.py --suggest 5
+"""
+
+import argparse
+import hashlib
+import math
+import os
+import random
+import string
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from mastermind_storage import StorageBackend, get_storage
+
+DEFAULT_NAMESPACES = ("aaa999", "aaaa999", "aaaaa9999")
+
+
+# --- Bloom Filter ---
+
+class BloomFilter:
+    """A set of strings that may answer "present" wrongly, at about error_rate, but never "absent"."""
+
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        self.capacity = max(1, capacity)
+        self.size = max(64, math.ceil(-self.capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, item: str) -> None:
+        for pos in self._positions(item):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        bits = self._bits
+        return all(bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+    @property
+    def nbytes(self) -> int:
+        return len(self._bits)
+
+
+# --- Username Namespaces ---
+
+class UsernameNamespace:
+    """All names of one shape: "a" in the pattern is a lowercase letter, "9" a digit."""
+
+    ALPHABETS = {"a": string.ascii_lowercase, "9": string.digits}
+
+    def __init__(self, pattern: str):
+        if not pattern or any(ch not in self.ALPHABETS for ch in pattern):
+            raise ValueError(f"Bad username pattern '{pattern}': use 'a' for letters and '9' for digits")
+        self.pattern = pattern
+        self._alphabets = [self.ALPHABETS[ch] for ch in pattern]
+        self.size = math.prod(len(alphabet) for alphabet in self._alphabets)
+        self.taken = 0 # Registered names of this shape known to the suggester
+
+    def __contains__(self, username: str) -> bool:
+        return len(username) == len(self._alphabets) and all(
+            ch in alphabet for ch, alphabet in zip(username, self._alphabets))
+
+    def random_name(self, rng: random.Random) -> str:
+        return "".join(rng.choice(alphabet) for alphabet in self._alphabets)
+
+    @property
+    def fullness(self) -> float:
+        return self.taken / self.size
+
+
+# --- Username Suggester ---
+
+class UsernameSuggester:
+    """Hands out unused names from the first namespace that is not yet too full."""
+
+    MAX_FULLNESS = 0.9 # Past this a namespace needs ~10 draws per name, so use the next one
+    MAX_DRAWS = 1000
+    HEADROOM = 2 # Filter capacity per registered user, for registrations after the build
+
+    def __init__(self, backend: StorageBackend, namespaces=DEFAULT_NAMESPACES,
+                 error_rate: float = 0.01, rng: Optional[random.Random] = None):
+        self.backend = backend
+        self.namespaces = [UsernameNamespace(pattern) for pattern in namespaces]
+        self.error_rate = error_rate
+        self.rng = rng or random.Random()
+        self._filter: Optional[BloomFilter] = None
+        self._lock = threading.RLock()
+
+    def build(self) -> int:
+        """Loads every registered username into a new filter; returns how many there are."""
+        with self._lock:
+            names = list(self.backend.usernames())
+            self._filter = BloomFilter(len(names) * self.HEADROOM + 1024, self.error_rate)
+            for namespace in self.namespaces:
+                namespace.taken = 0
+            for name in names:
+                self._remember(name)
+            return len(names)
+
+    def _ready(self) -> BloomFilter:
+        if self._filter is None or self._filter.count > self._filter.capacity:
+            self.build() # First use, or the filter is past its error rate
+        return self._filter
+
+    def _remember(self, username: str) -> None:
+        self._filter.add(username)
+        for namespace in self.namespaces:
+            if username in namespace:
+                namespace.taken += 1
+
+    def add(self, username: str) -> None:
+        """Records a newly registered username."""
+        with self._lock:
+            if username not in self._ready():
+                self._remember(username)
+
+    def suggest(self) -> Optional[str]:
+        """Returns an unused username, or None if every namespace is too full."""
+        with self._lock:
+            taken = self._ready()
+            for namespace in self.namespaces:
+                if namespace.fullness >= self.MAX_FULLNESS:
+                    continue
+                for _ in range(self.MAX_DRAWS):
+                    name = namespace.random_name(self.rng)
+                    if name in taken:
+                        continue # Taken, or a false positive: either way another draw is cheaper
+                    if not self.backend.user_exists(name):
+                        return name
+                    self._remember(name) # Registered by another process since the build
+        return None
+
+    def report(self) -> List[Tuple[str, int, int, float]]:
+        """(pattern, taken, size, fullness) for each namespace."""
+        with self._lock:
+            self._ready()
+            return [(ns.pattern, ns.taken, ns.size, ns.fullness) for ns in self.namespaces]
+
+
+_suggesters: Dict[StorageBackend, UsernameSuggester] = {}
+_suggesters_lock = threading.Lock()
+
+
+def get_username_suggester(backend: StorageBackend) -> UsernameSuggester:
+    """Returns the shared suggester for a backend; its filter is built on first use."""
+    with _suggesters_lock:
+        suggester = _suggesters.get(backend)
+        if suggester is None:
+            suggester = _suggesters[backend] = UsernameSuggester(backend)
+        return suggester
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report how full the username namespaces are.")
+    parser.add_argument("--storage", default=os.environ.get("MASTERMIND_STORAGE", "text"),
+                        help='"text", "binary[:<path>]" or "sqlite:<path>" (default: $MASTERMIND_STORAGE or text)')
+    parser.add_argument("--players", default="players.txt", help="players file for the text backends")
+    parser.add_argument("--suggest", type=int, default=0, help="also print this many suggestions")
+    args = parser.parse_args()
+
+    suggester = UsernameSuggester(get_storage(args.storage, args.players, "highscores.txt", "game_history.txt"))
+    users = suggester.build()
+    print(f"{users} registered users; filter: {suggester._filter.nbytes} bytes, "
+          f"{suggester._filter.hashes} hashes, ~{suggester.error_rate:.0%} false positives")
+    print(f"{'Namespace':<10} | {'Taken':>10} | {'Size':>14} | {'Full':>8}")
+    for pattern, taken, size, fullness in suggester.report():
+        print(f"{pattern:<10} | {taken:>10} | {size:>14} | {fullness:>8.4%}")
+    for _ in range(args.suggest):
+        print(suggester.suggest())
@@ -0,0 +1,218 @@
+"""Tests for the locked, group-committed storage in mastermind_storage.py.
+
+Run with: python -m pytest -q (or python -m unittest test_mastermind_storage)
+"""
+
+import os
+import tempfile
+import threading
+import time
+import unittest
+from typing import List
+
+from mastermind_storage import GroupCommit, PlayersRepository, UserDirectory
+
+
+def _wait_for(condition, timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("timed out waiting for the other threads")
+        time.sleep(0.001)
+
+
+class GroupCommitTest(unittest.TestCase):
+    def setUp(self):
+        self.batches: List[List[str]] = []
+        self.gate = threading.Event()
+        self.group = GroupCommit(self._write_batch)
+        self.results = {}
+
+    def _write_batch(self, items: List[str]) -> List[object]:
+        if not self.batches:
+            self.gate.wait(5) # Hold the first batch until the others have queued behind it
+        self.batches.append(list(items))
+        return [ValueError(item) if item.startswith("bad") else item.upper() for item in items]
+
+    def _submit(self, name: str, items: List[str]) -> threading.Thread:
+        def run():
+            try:
+                self.results[name] = self.group.submit_many(items)
+            except Exception as e:
+                self.results[name] = e
+        thread = threading.Thread(target=run)
+        thread.start()
+        return thread
+
+    def _queued(self) -> int:
+        with self.group._cond:
+            return len(self.group._queue)
+
+    def test_waiting_submitters_are_committed_together_in_order(self):
+        threads = [self._submit("leader", ["a"])]
+        _wait_for(lambda: self.group._writing)
+        threads.append(self._submit("second", ["b1", "b2"]))
+        _wait_for(lambda: self._queued() == 2)
+        threads.append(self._submit("third", ["c"]))
+        _wait_for(lambda: self._queued() == 3)
+        self.gate.set()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(self.batches, [["a"], ["b1", "b2", "c"]])
+        self.assertEqual(self.results, {"leader": ["A"], "second": ["B1", "B2"], "third": ["C"]})
+
+    def test_a_failed_item_is_raised_only_in_its_submitter(self):
+        threads = [self._submit("leader", ["a"])]
+        _wait_for(lambda: self.group._writing)
+        threads.append(self._submit("failing", ["b", "bad"]))
+        _wait_for(lambda: self._queued() == 2)
+        threads.append(self._submit("other", ["c"]))
+        _wait_for(lambda: self._queued() == 3)
+        self.gate.set()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertIsInstance(self.results["failing"], ValueError)
+        self.assertEqual(str(self.results["failing"]), "bad")
+        self.assertEqual(self.results["other"], ["C"])
+
+    def test_a_failed_batch_is_raised_in_every_submitter_and_the_next_batch_runs(self):
+        def write_batch(items):
+            if "crash" in items:
+                raise OSError("disk full")
+            return items
+        group = GroupCommit(write_batch)
+
+        with self.assertRaisesRegex(OSError, "disk full"):
+            group.submit_many(["x", "crash"])
+        self.assertEqual(group.submit("y"), "y")
+
+
+class AppendOnlyIndexTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "players.txt")
+
+    def _append(self, text: str) -> None:
+        """Appends as another process would, behind the repository's back."""
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(text)
+
+    def test_reads_only_the_appended_tail(self):
+        self._append("alice,a\n")
+        repo = PlayersRepository(self.path)
+        self.assertEqual(repo.get_password("alice"), "a")
+        loaded = repo._stamp
+
+        self._append("bob,b\nalice,a2\n")
+        self.assertEqual(repo.get_password("bob"), "b")
+        self.assertEqual(repo.get_password("alice"), "a2")
+        self.assertEqual(repo._stamp[0], loaded[0])
+        self.assertEqual(repo._records, 3)
+
+    def test_a_partial_last_line_is_read_again_once_complete(self):
+        self._append("alice,a\ncarol,c")
+        repo = PlayersRepository(self.path)
+        self.assertEqual(repo.get_password("carol"), "c")
+        self.assertEqual(repo._records, 1) # The unfinished record does not count yet
+
+        self._append("c2\n")
+        self.assertEqual(repo.get_password("carol"), "cc2")
+        self.assertEqual(repo._records, 2)
+        self.assertEqual(len(repo), 2)
+
+    def test_a_replaced_file_is_reloaded_in_full(self):
+        self._append("alice,a\nbob,b\n")
+        repo = PlayersRepository(self.path)
+        self.assertTrue(repo.exists("alice"))
+
+        replacement = self.path + ".new"
+        with open(replacement, "w", encoding="utf-8") as f:
+            f.write("bob,b2\ncarol,c\ndave,d\n")
+        os.replace(replacement, self.path)
+        self.assertFalse(repo.exists("alice"))
+        self.assertEqual(repo.get_password("bob"), "b2")
+        self.assertEqual(len(repo), 3)
+
+    def test_compaction_keeps_every_concurrent_append(self):
+        writers, changes = 4, 150
+        PlayersRepository(self.path).add_many([(f"w{t}", "0") for t in range(writers)])
+        repos = []
+
+        def write(t):
+            repo = PlayersRepository(self.path) # Its own lock and file handles, like another process
+            repos.append(repo)
+            for i in range(1, changes + 1):
+                repo.set_password(f"w{t}", str(i))
+                repo.add(f"w{t}_{i}", "new")
+
+        threads = [threading.Thread(target=write, args=(t,)) for t in range(writers)]
+        for thread in threads:
+            thread.start()
+        compactor = PlayersRepository(self.path)
+        compactions = 0
+        while any(thread.is_alive() for thread in threads) or not compactions:
+            compactor.compact()
+            compactions += 1
+        for thread in threads:
+            thread.join()
+        for repo in repos:
+            if repo._compactor is not None:
+                repo._compactor.join() # Writers may also have started a background compaction
+
+        fresh = PlayersRepository(self.path)
+        users = dict(fresh.users())
+        self.assertEqual(len(users), writers * (changes + 1))
+        for t in range(writers):
+            self.assertEqual(users[f"w{t}"], str(changes))
+            self.assertTrue(all(f"w{t}_{i}" in users for i in range(1, changes + 1)))
+        fresh.compact()
+        with open(self.path, encoding="utf-8") as f:
+            self.assertEqual(len(f.read().split("\n")) - 1, writers * (changes + 1))
+
+
+class UserDirectoryTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "players.txt")
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write("alice,old\nbob,b\n")
+        UserDirectory.build(self.path)
+
+    def test_records_appended_after_the_build_take_precedence(self):
+        repo = PlayersRepository(self.path)
+        repo.set_password("alice", "new")
+        repo.add("carol", "c")
+
+        directory = UserDirectory(self.path)
+        self.assertTrue(directory.is_current())
+        self.assertEqual(directory.get_password("alice"), "new")
+        self.assertEqual(directory.get_password("bob"), "b")
+        self.assertEqual(directory.get_password("carol"), "c")
+        self.assertIsNone(directory.get_password("dave"))
+
+    def test_a_mapped_directory_sees_later_appends(self):
+        directory = UserDirectory(self.path)
+        self.assertTrue(directory.is_current())
+        self.assertEqual(directory.get_password("alice"), "old")
+
+        PlayersRepository(self.path).set_password("alice", "new")
+        self.assertTrue(directory.is_current())
+        self.assertEqual(directory.get_password("alice"), "new")
+
+    def test_compaction_rebuilds_the_directory(self):
+        repo = PlayersRepository(self.path)
+        repo.set_password("alice", "new")
+        repo.compact()
+
+        directory = UserDirectory(self.path)
+        self.assertTrue(directory.is_current())
+        self.assertEqual(directory.get_password("alice"), "new")
+        self.assertEqual(directory._header[3], 2) # Compiled, not read from the tail
+
+
+if __name__ == "__main__":
+    unittest.main()